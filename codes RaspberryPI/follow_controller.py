@@ -0,0 +1,233 @@
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import serial
+
+SERIAL_PORT = os.environ.get("MOTOR_SERIAL_PORT", "/dev/ttyUSB0")
+BAUDRATE = int(os.environ.get("MOTOR_BAUDRATE", 9600))
+RATE_HZ = float(os.environ.get("FOLLOW_RATE_HZ", 10))        # Control loop frequency
+BASE_SPEED = int(os.environ.get("FOLLOW_BASE_SPEED", 25))     # Same speed as deplacement.py
+MAX_SPEED = int(os.environ.get("FOLLOW_MAX_SPEED", 40))
+TURN_SPEED = float(os.environ.get("FOLLOW_TURN_SPEED", 25))   # Wheel speed difference at 45 degrees
+SMOOTHING = float(os.environ.get("FOLLOW_SMOOTHING", 0.5))    # Weight of the new target, 1.0 disables smoothing
+MAX_STEP = float(os.environ.get("FOLLOW_MAX_STEP", 10))       # Largest speed change per tick
+TIMEOUT = float(os.environ.get("FOLLOW_TIMEOUT", 1.0))        # Stop when detections are older than this
+
+MAX_ANGLE = 45.0  # detect.py angles are within +-45 degrees
+
+
+def wheel_targets(angle, instruction, base_speed=BASE_SPEED, turn_speed=TURN_SPEED):
+    """Convert a detection to (motor 1, motor 2) speeds
+
+    Negative angles turn left, which like "gauche" in deplacement.py means
+    driving motor 1 faster.
+    """
+    forward = {"avance": base_speed, "recule": -base_speed}.get(instruction, 0)
+    turn = turn_speed * max(-1.0, min(1.0, float(angle) / MAX_ANGLE))
+    return forward - turn / 2, forward + turn / 2
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class FollowController:
+    """Turns a stream of detections into smoothed, rate-limited mogo commands
+
+    Detections are {"angle", "instruction", "timestamp"} where timestamp is the
+    epoch time the frame was captured. The serial port is written at a fixed
+    rate and the delay from frame capture to the first write that reflects it
+    is recorded. Do not run it alongside motor_daemon.py, both drive the port.
+    """
+
+    def __init__(self, port=SERIAL_PORT, baudrate=BAUDRATE, rate_hz=RATE_HZ, smoothing=SMOOTHING,
+                 max_step=MAX_STEP, max_speed=MAX_SPEED, timeout=TIMEOUT):
+        self.serial = serial.Serial(port, baudrate)
+        self.period = 1.0 / rate_hz
+        self.smoothing = smoothing
+        self.max_step = max_step
+        self.max_speed = max_speed
+        self.timeout = timeout
+
+        self.lock = threading.Lock()
+        self.detection = None
+        self.fresh = False  # Latest detection not written yet
+        self.speeds = (0.0, 0.0)
+        self.last_command = None
+        self.latencies_ms = []
+        self.stats = {"detections": 0, "skipped": 0, "writes": 0, "timeouts": 0, "errors": 0}
+        self.running = False
+
+    def update(self, detection):
+        """Replace the current detection, older unprocessed ones are skipped"""
+        detection = dict(detection)
+        detection.setdefault("timestamp", time.time())
+        with self.lock:
+            self.stats["detections"] += 1
+            if self.fresh:
+                self.stats["skipped"] += 1
+            self.detection = detection
+            self.fresh = True
+
+    def step(self, now=None):
+        """One control tick: smooth and rate-limit toward the target, then write"""
+        now = time.time() if now is None else now
+        with self.lock:
+            detection, fresh = self.detection, self.fresh
+            self.fresh = False
+
+        if detection is None or now - detection["timestamp"] > self.timeout:
+            if detection is not None and self.speeds != (0.0, 0.0):
+                self.stats["timeouts"] += 1
+            target = (0.0, 0.0)
+        else:
+            target = wheel_targets(detection.get("angle", 0), detection.get("instruction", ""))
+
+        speeds = []
+        for current, wanted in zip(self.speeds, target):
+            smoothed = current + self.smoothing * (wanted - current)
+            change = max(-self.max_step, min(self.max_step, smoothed - current))
+            speed = max(-self.max_speed, min(self.max_speed, current + change))
+            speeds.append(0.0 if abs(speed) < 0.5 and wanted == 0 else speed)
+        self.speeds = tuple(speeds)
+
+        left, right = (int(round(speed)) for speed in self.speeds)
+        command = "stop\r" if left == 0 and right == 0 else f"mogo 1:{left} 2:{right}\r"
+        self.serial.write(command.encode('utf-8'))
+        self.last_command = command
+        self.stats["writes"] += 1
+
+        if fresh:
+            self.latencies_ms.append((time.time() - detection["timestamp"]) * 1000)
+        return command
+
+    def control_loop(self):
+        next_tick = time.monotonic()
+        while self.running:
+            try:
+                self.step()
+            except Exception as e:
+                # A bad tick must not leave the motors on their last command
+                print(f"Error in control tick: {e}", file=sys.stderr)
+                self.stats["errors"] += 1
+                self.speeds = (0.0, 0.0)
+                try:
+                    self.serial.write(b"stop\r")
+                    self.last_command = "stop\r"
+                except Exception as e:
+                    print(f"Error writing stop: {e}", file=sys.stderr)
+            next_tick += self.period
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()  # Running late, do not try to catch up
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.control_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        self.serial.write(b"stop\r")
+        self.serial.close()
+
+    def report(self):
+        report = dict(self.stats)
+        if self.latencies_ms:
+            report["latency_p50_ms"] = round(percentile(self.latencies_ms, 0.50), 1)
+            report["latency_p95_ms"] = round(percentile(self.latencies_ms, 0.95), 1)
+        return report
+
+
+def parse_timestamp(value):
+    """Epoch seconds from a number or an ISO string, None when unparseable
+
+    ISO strings without a timezone are UTC, as enhanced_detect.py writes them
+    with numpy's datetime64('now').
+    """
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def parse_detection(line):
+    """Accept detect.py output and enhanced_detect.py's navigation dict"""
+    detection = json.loads(line)
+    if "navigation" in detection:
+        navigation = detection["navigation"]
+        detection = {"angle": navigation.get("angle", 0), "instruction": navigation.get("instruction", ""),
+                     "timestamp": detection.get("timestamp")}
+    timestamp = parse_timestamp(detection.pop("timestamp", None))
+    if timestamp is not None:
+        detection["timestamp"] = timestamp
+    detection["angle"] = float(detection.get("angle") or 0)
+    return detection
+
+
+def feed(controller, lines, replay=False):
+    """Send JSON line detections to the controller
+
+    With replay, recorded detections keep their original spacing and get fresh
+    timestamps so latency is measured as if they were live.
+    """
+    first_recorded = first_local = None
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            detection = parse_detection(line)
+        except (ValueError, TypeError, AttributeError) as e:
+            print(f"Invalid detection: {e}", file=sys.stderr)
+            continue
+
+        if replay and "timestamp" in detection:
+            if first_recorded is None:
+                first_recorded, first_local = detection["timestamp"], time.time()
+            due = first_local + detection["timestamp"] - first_recorded
+            delay = due - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            detection["timestamp"] = due
+        controller.update(detection)
+
+
+if __name__ == "__main__":
+    replay = "--replay" in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != "--replay"]
+    if len(args) > 1:
+        print("Usage: python3 follow_controller.py [detections.jsonl] [--replay]")
+        print("       detections are read from stdin when no file is given")
+        sys.exit(1)
+
+    controller = FollowController()
+    controller.start()
+    try:
+        if args:
+            with open(args[0]) as f:
+                feed(controller, f, replay)
+            time.sleep(controller.timeout)  # Let the last detection play out, then the timeout stops
+        else:
+            feed(controller, sys.stdin)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        controller.stop()
+        print(json.dumps(controller.report()), file=sys.stderr)
@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+
+import cv2
+
+# letterbox.py is a copy of serveur/server/scripts/letterbox.py, so boxes map back
+# identically; test_letterbox.py checks both copies stay the same
+from letterbox import DETECTOR_SIZE, add_jpeg_metadata, letterbox
+
+TARGET_BYTES = int(os.environ.get("FRAME_TARGET_BYTES", 20000))
+MIN_QUALITY = 30
+MAX_QUALITY = 90
+TOLERANCE = 0.15  # Frames within 15% of the target keep the current quality
+
+
+class FramePreprocessor:
+    """Letterboxes camera frames to the detector size and encodes them near a byte budget
+
+    JPEG quality is carried over between frames and adjusted from the size of
+    the last encode, re-encoding a frame at most once when it overshoots.
+    """
+
+    def __init__(self, size=DETECTOR_SIZE, target_bytes=TARGET_BYTES, min_quality=MIN_QUALITY,
+                 max_quality=MAX_QUALITY):
+        self.size = size
+        self.target_bytes = target_bytes
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.quality = (min_quality + max_quality) // 2
+
+    def encode(self, canvas, quality):
+        ok, buffer = cv2.imencode('.jpg', canvas, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return buffer.tobytes()
+
+    def next_quality(self, size):
+        """Step the quality toward the byte target, bigger steps when far from it"""
+        ratio = size / self.target_bytes
+        if abs(ratio - 1) <= TOLERANCE:
+            return self.quality
+        step = max(1, min(20, int(abs(ratio - 1) * 20)))
+        quality = self.quality - step if ratio > 1 else self.quality + step
+        return max(self.min_quality, min(self.max_quality, quality))
+
+    def process(self, frame, timestamp=None):
+        """Return (jpeg_bytes, metadata) for one BGR frame
+
+        The metadata (scale, offsets, original size, quality, capture
+        timestamp) is also embedded in the JPEG as a comment.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        canvas, metadata = letterbox(frame, self.size, self.size)
+
+        jpeg = self.encode(canvas, self.quality)
+        quality = self.next_quality(len(jpeg))
+        if len(jpeg) > self.target_bytes * (1 + TOLERANCE) and quality != self.quality:
+            # Over budget: spend one more encode rather than send an oversized frame
+            self.quality = quality
+            jpeg = self.encode(canvas, self.quality)
+            quality = self.next_quality(len(jpeg))
+
+        metadata.update({'quality': self.quality, 'bytes': len(jpeg), 'timestamp': timestamp})
+        self.quality = quality
+        return add_jpeg_metadata(jpeg, metadata), metadata
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python3 frame_preprocess.py <image_file> <output_file>")
+        sys.exit(1)
+
+    image = cv2.imread(sys.argv[1])
+    if image is None:
+        print(f"Error loading image: {sys.argv[1]}", file=sys.stderr)
+        sys.exit(1)
+
+    jpeg, metadata = FramePreprocessor().process(image)
+    with open(sys.argv[2], 'wb') as f:
+        f.write(jpeg)
+    print(metadata)
@@ -0,0 +1,78 @@
+import json
+import struct
+
+import cv2
+import numpy as np
+
+DETECTOR_SIZE = 416
+BACKGROUND = 255          # White background, as the detectors were tuned with
+COMMENT_PREFIX = b"letterbox:"
+
+
+def letterbox(image, width=DETECTOR_SIZE, height=DETECTOR_SIZE, background=BACKGROUND):
+    """Fit image in a width x height canvas keeping the aspect ratio
+
+    Returns (canvas, metadata) where metadata gives the scale and offsets
+    needed to map canvas coordinates back to the original image.
+    """
+    original_height, original_width = image.shape[:2]
+    scale = min(width / original_width, height / original_height)
+
+    new_width = int(original_width * scale)
+    new_height = int(original_height * scale)
+    resized = cv2.resize(image, (new_width, new_height))
+
+    canvas = background * np.ones((height, width, 3), dtype=np.uint8)
+    x_offset = (width - new_width) // 2
+    y_offset = (height - new_height) // 2
+    canvas[y_offset:y_offset + new_height, x_offset:x_offset + new_width] = resized
+
+    return canvas, {
+        'scale': scale,
+        'x_offset': x_offset,
+        'y_offset': y_offset,
+        'original_width': original_width,
+        'original_height': original_height
+    }
+
+
+def to_original_box(box, metadata):
+    """Map an [x, y, w, h] box from the letterboxed canvas to the original image"""
+    x, y, w, h = box
+    scale = metadata['scale']
+    return [
+        int(round((x - metadata['x_offset']) / scale)),
+        int(round((y - metadata['y_offset']) / scale)),
+        int(round(w / scale)),
+        int(round(h / scale))
+    ]
+
+
+def add_jpeg_metadata(jpeg_bytes, metadata):
+    """Insert metadata as a JPEG comment right after the SOI marker
+
+    Viewers ignore the comment, so the frame still displays as a normal JPEG.
+    """
+    payload = COMMENT_PREFIX + json.dumps(metadata).encode('utf-8')
+    segment = b"\xff\xfe" + struct.pack(">H", len(payload) + 2) + payload
+    return jpeg_bytes[:2] + segment + jpeg_bytes[2:]
+
+
+def read_jpeg_metadata(jpeg_bytes):
+    """Return the letterbox metadata stored by add_jpeg_metadata, or None"""
+    if jpeg_bytes[:2] != b"\xff\xd8":
+        return None
+    pos = 2
+    while pos + 4 <= len(jpeg_bytes) and jpeg_bytes[pos] == 0xFF:
+        marker = jpeg_bytes[pos + 1]
+        if marker == 0xDA:  # Start of scan, no more headers
+            return None
+        length = struct.unpack(">H", jpeg_bytes[pos + 2:pos + 4])[0]
+        payload = jpeg_bytes[pos + 4:pos + 2 + length]
+        if marker == 0xFE and payload.startswith(COMMENT_PREFIX):
+            try:
+                return json.loads(payload[len(COMMENT_PREFIX):].decode('utf-8'))
+            except ValueError:
+                return None
+        pos += 2 + length
+    return None
@@ -0,0 +1,160 @@
+import os
+import socket
+import sys
+import threading
+import time
+
+import serial
+
+# Same serial strings as deplacement.py
+COMMANDS = {
+    "avance": "mogo 1:25 2:25\r",
+    "recule": "mogo 1:-25 2:-25\r",
+    "gauche": "mogo 1:25\r",
+    "droite": "mogo 2:25\r",
+    "Stop": "stop\r",
+}
+STOP = "Stop"
+
+SERIAL_PORT = os.environ.get("MOTOR_SERIAL_PORT", "/dev/ttyUSB0")
+BAUDRATE = int(os.environ.get("MOTOR_BAUDRATE", 9600))
+SOCKET_PATH = os.environ.get("MOTOR_SOCKET", "/tmp/dynami_motor.sock")
+KEEPALIVE = float(os.environ.get("MOTOR_KEEPALIVE", 0.5))  # Resend the current command this often
+WATCHDOG = float(os.environ.get("MOTOR_WATCHDOG", 1.0))    # Stop when no command arrived for this long, 0 disables
+
+
+class MotorDaemon:
+    """Holds the serial port open and drives it with the latest command received
+
+    Commands arrive as datagrams on a Unix socket. Only the most recent one is
+    kept, it is written when it changes and repeated on every keep-alive tick,
+    and the watchdog switches to stop when senders go quiet.
+    """
+
+    def __init__(self, port=SERIAL_PORT, baudrate=BAUDRATE, socket_path=SOCKET_PATH,
+                 keepalive=KEEPALIVE, watchdog=WATCHDOG):
+        self.serial = serial.Serial(port, baudrate)
+        self.socket_path = socket_path
+        self.keepalive = keepalive
+        self.watchdog = watchdog
+
+        self.condition = threading.Condition()
+        self.latest = STOP
+        self.pending = False  # latest was received but not yet taken by the control loop
+        self.received_at = time.monotonic()
+        self.running = False
+
+        self.sent = None
+        self.sent_at = 0.0
+        self.stats = {"received": 0, "coalesced": 0, "writes": 0, "watchdog_stops": 0, "invalid": 0}
+
+    def submit(self, command):
+        """Replace the pending command, returns False for unknown commands"""
+        if command not in COMMANDS:
+            self.stats["invalid"] += 1
+            return False
+        with self.condition:
+            self.stats["received"] += 1
+            if self.pending:
+                self.stats["coalesced"] += 1  # The previous command was never written
+            self.latest = command
+            self.pending = True
+            self.received_at = time.monotonic()
+            self.condition.notify()
+        return True
+
+    def write(self, command):
+        self.serial.write(COMMANDS[command].encode('utf-8'))
+        self.sent = command
+        self.sent_at = time.monotonic()
+        self.stats["writes"] += 1
+
+    def control_loop(self):
+        """Write on change, on keep-alive ticks and when the watchdog fires"""
+        while self.running:
+            with self.condition:
+                now = time.monotonic()
+                deadline = self.sent_at + self.keepalive
+                if self.watchdog > 0 and self.latest != STOP:
+                    deadline = min(deadline, self.received_at + self.watchdog)
+                if self.latest == self.sent and now < deadline:
+                    self.condition.wait(deadline - now)
+
+                now = time.monotonic()
+                if self.watchdog > 0 and self.latest != STOP and now - self.received_at >= self.watchdog:
+                    self.latest = STOP
+                    self.stats["watchdog_stops"] += 1
+                command = self.latest
+                self.pending = False
+
+            if command != self.sent or time.monotonic() - self.sent_at >= self.keepalive:
+                self.write(command)
+
+    def socket_loop(self, sock):
+        while self.running:
+            try:
+                data = sock.recv(64)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            command = data.decode('utf-8', errors='replace').strip()
+            if not self.submit(command):
+                print(f"Commande non reconnue: {command}", file=sys.stderr)
+
+    def start(self):
+        """Bind the socket and run both loops in background threads"""
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.socket_path)
+        self.sock.settimeout(0.2)
+
+        self.running = True
+        self.threads = [
+            threading.Thread(target=self.control_loop, daemon=True),
+            threading.Thread(target=self.socket_loop, args=(self.sock,), daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        """Send a final stop and release the port and the socket"""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        for thread in self.threads:
+            thread.join()
+        self.write(STOP)
+        self.serial.close()
+        self.sock.close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def send_command(command, socket_path=SOCKET_PATH):
+    """Client side: hand a command to the running daemon"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        sock.sendto(command.encode('utf-8'), socket_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "send":
+        send_command(sys.argv[2])
+        sys.exit(0)
+
+    if len(sys.argv) != 1:
+        print("Usage: python3 motor_daemon.py              (run the daemon)")
+        print("       python3 motor_daemon.py send <avance|recule|gauche|droite|Stop>")
+        sys.exit(1)
+
+    daemon = MotorDaemon()
+    daemon.start()
+    print(f"Motor daemon on {SERIAL_PORT}, commands on {SOCKET_PATH}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        daemon.stop()
+        print("\nProgramme arrêté.")
+        sys.exit()
@@ -1,8 +1,16 @@
-import serial 
+from telemetry import TelemetryReader
 
-ser = serial.Serial('/dev/ttyUSB0', 9600)
+reader = TelemetryReader()
+subscription = reader.subscribe()
+reader.start()
 
-while True:
-    data = ser.readline(32).decode('utf-8').strip()
-    if data != "":
-        print(data)
\ No newline at end of file
+try:
+    while reader.running:
+        message = subscription.get(timeout=1.0)
+        if message is not None:
+            print(message["text"])
+except KeyboardInterrupt:
+    pass
+finally:
+    reader.stop()
+    print(reader.stats())
@@ -0,0 +1,220 @@
+import collections
+import os
+import sys
+import threading
+import time
+
+import serial
+
+SERIAL_PORT = os.environ.get("TELEMETRY_SERIAL_PORT", "/dev/ttyUSB0")
+BAUDRATE = int(os.environ.get("TELEMETRY_BAUDRATE", 9600))
+RING_SIZE = 4096          # Bytes kept between the port and the parser
+HISTORY_SIZE = 50         # Values kept per sensor
+SUBSCRIBER_QUEUE = 100    # Messages kept per subscriber before the oldest are dropped
+
+
+class ByteRing:
+    """Fixed-size byte ring buffer, overwriting the oldest bytes when full"""
+
+    def __init__(self, size=RING_SIZE):
+        self.buffer = bytearray(size)
+        self.size = size
+        self.start = 0
+        self.length = 0
+
+    def write(self, data):
+        """Append data, returns the number of old bytes overwritten"""
+        dropped = 0
+        if len(data) > self.size:
+            dropped += len(data) - self.size
+            data = data[-self.size:]
+        overflow = self.length + len(data) - self.size
+        if overflow > 0:
+            self.start = (self.start + overflow) % self.size
+            self.length -= overflow
+            dropped += overflow
+
+        end = (self.start + self.length) % self.size
+        first = min(len(data), self.size - end)
+        self.buffer[end:end + first] = data[:first]
+        self.buffer[:len(data) - first] = data[first:]
+        self.length += len(data)
+        return dropped
+
+    def peek(self):
+        end = self.start + self.length
+        if end <= self.size:
+            return bytes(self.buffer[self.start:end])
+        return bytes(self.buffer[self.start:]) + bytes(self.buffer[:end - self.size])
+
+    def consume(self, count):
+        self.start = (self.start + count) % self.size
+        self.length -= count
+
+    def pop_frames(self, delimiter=b"\n"):
+        """Remove and return every complete delimited frame"""
+        data = self.peek()
+        end = data.rfind(delimiter)
+        if end < 0:
+            return []
+        self.consume(end + 1)
+        return data[:end].split(delimiter)
+
+
+def parse_frame(frame):
+    """Parse "name:value name=value" or a bare event word into a dict
+
+    The STM32 sends "stop" when an obstacle is close, so bare words become
+    events with the value True. Numbers are converted, anything else stays text.
+    """
+    text = frame.decode('utf-8').strip(" \t\r\0")
+    if not text:
+        return None
+
+    values = {}
+    for token in text.split():
+        for separator in (":", "="):
+            if separator in token:
+                name, value = token.split(separator, 1)
+                break
+        else:
+            name, value = token, True
+        if not name or value == "":
+            raise ValueError(f"Malformed token: {token}")
+        if value is not True:
+            try:
+                value = float(value)
+            except ValueError:
+                pass
+        values[name] = value
+    return values
+
+
+class Subscription:
+    """Bounded message queue for one consumer, the oldest messages are dropped"""
+
+    def __init__(self, maxlen=SUBSCRIBER_QUEUE):
+        self.queue = collections.deque(maxlen=maxlen)
+        self.condition = threading.Condition()
+        self.dropped = 0
+
+    def put(self, message):
+        with self.condition:
+            dropped = len(self.queue) == self.queue.maxlen
+            if dropped:
+                self.dropped += 1
+            self.queue.append(message)
+            self.condition.notify()
+        return dropped
+
+    def get(self, timeout=None):
+        """Oldest pending message, or None after timeout"""
+        with self.condition:
+            if not self.queue:
+                self.condition.wait(timeout)
+            return self.queue.popleft() if self.queue else None
+
+
+class TelemetryReader:
+    """Drains the serial port in a background thread and publishes parsed frames
+
+    Each message is {"timestamp", "values", "text"}, text being the frame as
+    received. latest() and history() give a per sensor view, subscribe() a
+    queue of every message. A port failure stops the reader and is kept in error.
+    """
+
+    def __init__(self, port=SERIAL_PORT, baudrate=BAUDRATE, ring_size=RING_SIZE, history_size=HISTORY_SIZE):
+        self.serial = serial.Serial(port, baudrate, timeout=0.1)
+        self.ring = ByteRing(ring_size)
+        self.history_size = history_size
+
+        self.lock = threading.Lock()
+        self.latest_values = {}
+        self.histories = {}
+        self.subscriptions = []
+        self.counters = {"bytes": 0, "frames": 0, "parse_errors": 0, "dropped_bytes": 0, "dropped_messages": 0}
+        self.running = False
+        self.error = None
+
+    def subscribe(self, maxlen=SUBSCRIBER_QUEUE):
+        subscription = Subscription(maxlen)
+        with self.lock:
+            self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.remove(subscription)
+
+    def latest(self, sensor):
+        """Return (timestamp, value) of the last reading, or None"""
+        with self.lock:
+            return self.latest_values.get(sensor)
+
+    def history(self, sensor):
+        """Return the recent (timestamp, value) readings, oldest first"""
+        with self.lock:
+            return list(self.histories.get(sensor, ()))
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+    def feed(self, data, timestamp=None):
+        """Process raw bytes as if read from the port, returns the parsed messages"""
+        timestamp = time.time() if timestamp is None else timestamp
+        messages = []
+        with self.lock:
+            self.counters["bytes"] += len(data)
+            self.counters["dropped_bytes"] += self.ring.write(data)
+            for frame in self.ring.pop_frames():
+                try:
+                    values = parse_frame(frame)
+                except ValueError:  # UnicodeDecodeError included
+                    self.counters["parse_errors"] += 1
+                    continue
+                if values is None:
+                    continue
+                self.counters["frames"] += 1
+                for sensor, value in values.items():
+                    self.latest_values[sensor] = (timestamp, value)
+                    if sensor not in self.histories:
+                        self.histories[sensor] = collections.deque(maxlen=self.history_size)
+                    self.histories[sensor].append((timestamp, value))
+                messages.append({"timestamp": timestamp, "values": values,
+                                 "text": frame.decode('utf-8').strip(" \t\r\0")})
+            subscriptions = list(self.subscriptions)
+
+        for message in messages:
+            for subscription in subscriptions:
+                if subscription.put(message):
+                    with self.lock:
+                        self.counters["dropped_messages"] += 1
+        return messages
+
+    def read_loop(self):
+        while self.running:
+            try:
+                # Block for the first byte, then take everything already waiting
+                data = self.serial.read(1)
+                if data:
+                    data += self.serial.read(self.serial.in_waiting)
+            except (serial.SerialException, OSError) as e:
+                if self.running:
+                    # Unplugged or failing port: stop instead of dying silently in the thread
+                    print(f"Error reading telemetry: {e}", file=sys.stderr)
+                    self.error = e
+                    self.running = False
+                break
+            if data:
+                self.feed(data)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.read_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        self.serial.close()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Follow controller test against recorded detections and a pseudo-terminal
+
+Feeds detect.py lines and enhanced_detect.py navigation dicts (ISO timestamps)
+through the controller, with and without --replay, and reads back what it
+writes to the fake serial port.
+"""
+
+import json
+import os
+import pty
+import select
+import sys
+import time
+import tty
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from follow_controller import FollowController, feed, parse_detection
+
+def open_pty():
+    """Return (master fd, slave fd, slave path) of a raw pseudo-terminal"""
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    return master, slave, os.ttyname(slave)
+
+def read_commands(master, duration):
+    """Commands written to the pty during duration seconds"""
+    data = b""
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        ready, _, _ = select.select([master], [], [], 0.05)
+        if ready:
+            data += os.read(master, 4096)
+    return [command for command in data.decode("utf-8").split("\r") if command]
+
+def recorded_lines(start):
+    """Two detect.py lines then two enhanced_detect.py lines, 100 ms apart"""
+    iso = lambda t: datetime.fromtimestamp(t, timezone.utc).replace(tzinfo=None).isoformat()
+    return [
+        json.dumps({"angle": -20, "instruction": "avance", "timestamp": start}),
+        json.dumps({"angle": -10, "instruction": "avance", "timestamp": start + 0.1}),
+        json.dumps({"navigation": {"angle": 15, "instruction": "avance"}, "timestamp": iso(start + 0.2)}),
+        json.dumps({"navigation": {"angle": 0, "instruction": "stop"}, "timestamp": iso(start + 0.3)})
+    ]
+
+def test_parse_detection():
+    """Both formats give a numeric timestamp, unparseable ones are dropped"""
+    print("🧪 Testing detection parsing...")
+    now = time.time()
+    plain = parse_detection(json.dumps({"angle": 10, "instruction": "avance", "timestamp": now}))
+    assert plain["timestamp"] == now
+
+    iso = datetime.fromtimestamp(now, timezone.utc).replace(tzinfo=None).isoformat()
+    navigation = parse_detection(json.dumps({"navigation": {"angle": 5, "instruction": "avance"}, "timestamp": iso}))
+    assert abs(navigation["timestamp"] - now) < 1e-3, navigation
+    assert navigation["angle"] == 5.0
+
+    invalid = parse_detection(json.dumps({"angle": 0, "instruction": "stop", "timestamp": "yesterday"}))
+    assert "timestamp" not in invalid
+    print("✅ Parsing ok")
+
+def run_feed(replay):
+    master, slave, name = open_pty()
+    controller = FollowController(port=name, rate_hz=20, timeout=0.5)
+    controller.start()
+    try:
+        feed(controller, recorded_lines(time.time()), replay)
+        commands = read_commands(master, 0.8)
+    finally:
+        controller.stop()
+        os.close(master)
+        os.close(slave)
+    return controller, commands
+
+def test_live_and_replay():
+    """The controller keeps running and ends stopped with both detection formats"""
+    for replay in (False, True):
+        print(f"🧪 Testing feed with replay={replay}...")
+        controller, commands = run_feed(replay)
+        report = controller.report()
+        assert controller.thread is not None and report["errors"] == 0, report
+        assert report["detections"] == 4, report
+        if replay:
+            # Live feeding delivers all lines at once, only the final stop is seen
+            assert any(command.startswith("mogo") for command in commands), commands
+        assert commands[-1] == "stop", commands
+        print(f"✅ {len(commands)} commands, {report}")
+
+def test_bad_tick_stops_motors():
+    """A tick that raises writes stop and the control thread survives"""
+    print("🧪 Testing a failing tick...")
+    master, slave, name = open_pty()
+    controller = FollowController(port=name, rate_hz=20, timeout=5.0)
+    controller.start()
+    try:
+        controller.update({"angle": 0, "instruction": "avance", "timestamp": time.time()})
+        assert any(command.startswith("mogo") for command in read_commands(master, 0.3))
+        controller.update({"angle": 0, "instruction": "avance", "timestamp": "not a number"})
+        commands = read_commands(master, 0.3)
+        assert commands and all(command == "stop" for command in commands), commands
+        assert controller.thread.is_alive()
+        assert controller.stats["errors"] > 0
+    finally:
+        controller.stop()
+        os.close(master)
+        os.close(slave)
+    print("✅ Failing ticks write stop")
+
+if __name__ == "__main__":
+    try:
+        print("🚀 Starting follow controller tests...")
+        test_parse_detection()
+        test_live_and_replay()
+        test_bad_tick_stops_motors()
+        print("\n🎉 All follow controller tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Letterbox parity test
+
+The Pi keeps its own copy of letterbox.py so it can be deployed without the
+server tree. When both trees are checked out, the copies must be identical,
+otherwise boxes would no longer map back the same way on both sides.
+"""
+
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from letterbox import add_jpeg_metadata, letterbox, read_jpeg_metadata, to_original_box
+
+PI_COPY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'letterbox.py')
+SERVER_COPY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'serveur', 'server', 'scripts',
+                           'letterbox.py')
+
+def test_copies_match():
+    """The Pi copy is byte for byte the server one"""
+    print("🧪 Testing letterbox.py parity...")
+    if not os.path.exists(SERVER_COPY):
+        print("   Server tree not checked out, skipping")
+        return
+    with open(PI_COPY, 'rb') as pi_file, open(SERVER_COPY, 'rb') as server_file:
+        assert pi_file.read() == server_file.read(), \
+            "codes RaspberryPI/letterbox.py differs from serveur/server/scripts/letterbox.py, copy it again"
+    print("✅ Copies match")
+
+def test_round_trip():
+    """A box on the letterboxed frame maps back through the embedded metadata"""
+    print("🧪 Testing letterbox metadata round trip...")
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+    canvas, metadata = letterbox(image)
+    assert canvas.shape == (416, 416, 3)
+
+    ok, encoded = cv2.imencode('.jpg', canvas)
+    assert ok
+    restored = read_jpeg_metadata(add_jpeg_metadata(encoded.tobytes(), metadata))
+    assert restored == metadata, (restored, metadata)
+    x, y, w, h = to_original_box([0, int(metadata['y_offset']), 416, 416 - 2 * int(metadata['y_offset'])], restored)
+    assert abs(w - 640) <= 2 and abs(h - 480) <= 2, (x, y, w, h)
+    print("✅ Round trip ok")
+
+if __name__ == "__main__":
+    try:
+        print("🚀 Starting letterbox tests...")
+        test_copies_match()
+        test_round_trip()
+        print("\n🎉 All letterbox tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Motor daemon test against a pseudo-terminal and a temporary socket
+
+Sends commands over the daemon's Unix socket and reads back what it writes
+to the fake serial port: writes on change only, keep-alive resends,
+coalescing of commands that arrive faster than they are written, and the
+watchdog stop.
+"""
+
+import os
+import pty
+import select
+import shutil
+import sys
+import tempfile
+import time
+import tty
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from motor_daemon import MotorDaemon, send_command
+
+def open_pty():
+    """Return (master fd, slave fd, slave path) of a raw pseudo-terminal"""
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    return master, slave, os.ttyname(slave)
+
+def read_commands(master, duration):
+    """Commands written to the pty during duration seconds"""
+    data = b""
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        ready, _, _ = select.select([master], [], [], 0.05)
+        if ready:
+            data += os.read(master, 4096)
+    return [command for command in data.decode("utf-8").split("\r") if command]
+
+def run_daemon(test, keepalive=10.0, watchdog=0):
+    """Start a daemon on a pty and a temporary socket, call test(daemon, master, socket_path)"""
+    master, slave, name = open_pty()
+    directory = tempfile.mkdtemp(prefix="motor_daemon_test_")
+    socket_path = os.path.join(directory, "motor.sock")
+    daemon = MotorDaemon(port=name, socket_path=socket_path, keepalive=keepalive, watchdog=watchdog)
+    daemon.start()
+    try:
+        # The daemon starts by writing stop, repeated on keep-alive ticks
+        commands = read_commands(master, 0.2)
+        assert commands and set(commands) == {"stop"}, commands
+        test(daemon, master, socket_path)
+    finally:
+        daemon.stop()
+        os.close(master)
+        os.close(slave)
+        shutil.rmtree(directory)
+    return daemon.stats
+
+def test_write_on_change():
+    """A repeated command is not written again before the keep-alive"""
+    print("🧪 Testing writes on change...")
+
+    def test(daemon, master, socket_path):
+        send_command("avance", socket_path)
+        assert read_commands(master, 0.3) == ["mogo 1:25 2:25"]
+        send_command("avance", socket_path)
+        assert read_commands(master, 0.3) == []
+        send_command("Stop", socket_path)
+        send_command("demi-tour", socket_path)
+        assert read_commands(master, 0.3) == ["stop"]
+
+    stats = run_daemon(test)
+    print(f"   {stats}")
+    assert stats["received"] == 3 and stats["invalid"] == 1, stats
+    assert stats["coalesced"] == 0, stats
+    print("✅ Written on change only")
+
+def test_keepalive():
+    """The current command is resent on every keep-alive tick"""
+    print("🧪 Testing keep-alive resends...")
+
+    def test(daemon, master, socket_path):
+        send_command("recule", socket_path)
+        commands = read_commands(master, 0.55)
+        assert 4 <= len(commands) <= 7 and set(commands) == {"mogo 1:-25 2:-25"}, commands
+
+    run_daemon(test, keepalive=0.1)
+    print("✅ Keep-alive resent")
+
+def test_coalescing():
+    """Commands received while the control loop is busy collapse into the latest"""
+    print("🧪 Testing coalescing...")
+
+    def test(daemon, master, socket_path):
+        with daemon.condition:  # Keeps the control loop from taking commands
+            for command in ("avance", "recule", "gauche"):
+                assert daemon.submit(command)
+        assert read_commands(master, 0.3) == ["mogo 1:25"]
+
+    stats = run_daemon(test)
+    print(f"   {stats}")
+    assert stats["received"] == 3 and stats["coalesced"] == 2, stats
+    print("✅ Only the latest command written")
+
+def test_first_command_not_coalesced():
+    """A command received before anything was written replaces nothing"""
+    print("🧪 Testing the first command...")
+    master, slave, name = open_pty()
+    directory = tempfile.mkdtemp(prefix="motor_daemon_test_")
+    daemon = MotorDaemon(port=name, socket_path=os.path.join(directory, "motor.sock"), keepalive=10.0, watchdog=0)
+    try:
+        assert daemon.submit("avance")
+        daemon.start()
+        assert read_commands(master, 0.2) == ["mogo 1:25 2:25"]
+    finally:
+        daemon.stop()
+        os.close(master)
+        os.close(slave)
+        shutil.rmtree(directory)
+    assert daemon.stats["coalesced"] == 0, daemon.stats
+    print("✅ First command not coalesced")
+
+def test_watchdog():
+    """Senders going quiet make the daemon write stop"""
+    print("🧪 Testing the watchdog...")
+
+    def test(daemon, master, socket_path):
+        send_command("droite", socket_path)
+        assert read_commands(master, 0.15) == ["mogo 2:25"]
+        assert read_commands(master, 0.4) == ["stop"]
+
+    stats = run_daemon(test, watchdog=0.3)
+    assert stats["watchdog_stops"] == 1, stats
+    print("✅ Watchdog stopped the motors")
+
+if __name__ == "__main__":
+    try:
+        print("🚀 Starting motor daemon tests...")
+        test_write_on_change()
+        test_keepalive()
+        test_coalescing()
+        test_first_command_not_coalesced()
+        test_watchdog()
+        print("\n🎉 All motor daemon tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
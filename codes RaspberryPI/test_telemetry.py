@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Telemetry reader test against a pseudo-terminal
+
+Writes STM32-style frames, a malformed frame, an oversized burst and more
+messages than a slow subscriber keeps, then checks the reader's counters.
+"""
+
+import os
+import pty
+import sys
+import time
+import tty
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from telemetry import TelemetryReader
+
+def open_pty():
+    """Return (master fd, slave fd, slave path) of a raw pseudo-terminal"""
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    return master, slave, os.ttyname(slave)
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_frames_and_counters():
+    """Frames, a parse error, ring overflow and a slow subscriber through a pty"""
+    print("🧪 Testing telemetry over a pty...")
+    master, slave, name = open_pty()
+    reader = TelemetryReader(port=name, ring_size=64)
+    slow = reader.subscribe(maxlen=2)
+    fast = reader.subscribe()
+    reader.start()
+    try:
+        os.write(master, b"dist:12 speed=3.5\nstop\n")
+        assert wait_for(lambda: reader.stats()["frames"] == 2), reader.stats()
+        assert reader.latest("dist")[1] == 12.0
+        assert reader.latest("stop")[1] is True
+        assert fast.get(timeout=1.0)["text"] == "dist:12 speed=3.5"  # Printed as received
+
+        os.write(master, b"dist:\n")
+        assert wait_for(lambda: reader.stats()["parse_errors"] == 1), reader.stats()
+
+        # More than the 64-byte ring without a delimiter: the oldest bytes are dropped
+        os.write(master, b"x" * 200 + b"\n")
+        assert wait_for(lambda: reader.stats()["dropped_bytes"] > 0), reader.stats()
+
+        for value in range(5):
+            os.write(master, f"dist:{value}\n".encode())
+            time.sleep(0.02)
+        assert wait_for(lambda: reader.latest("dist")[1] == 4.0)
+        assert [entry[1] for entry in reader.history("dist")][-5:] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    finally:
+        reader.stop()
+        os.close(master)
+        os.close(slave)
+
+    stats = reader.stats()
+    print(f"   {stats}")
+    # The slow subscriber never read: it keeps the last two messages only
+    assert len(slow.queue) == 2 and slow.queue[-1]["values"]["dist"] == 4.0
+    assert stats["dropped_messages"] == slow.dropped > 0, stats
+    assert fast.dropped == 0
+    print("✅ Counters ok")
+
+def test_port_failure_stops_reader():
+    """Closing the other end of the pty stops the reader with an error"""
+    print("🧪 Testing a port failure...")
+    master, slave, name = open_pty()
+    reader = TelemetryReader(port=name)
+    reader.start()
+    os.close(master)
+    os.close(slave)
+    try:
+        assert wait_for(lambda: not reader.thread.is_alive()), "reader thread still running"
+        assert not reader.running and reader.error is not None
+    finally:
+        reader.stop()
+    print(f"✅ Reader stopped: {reader.error}")
+
+if __name__ == "__main__":
+    try:
+        print("🚀 Starting telemetry tests...")
+        test_frames_and_counters()
+        test_port_failure_stops_reader()
+        print("\n🎉 All telemetry tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
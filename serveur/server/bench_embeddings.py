@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark embedding throughput across the RAG embedding backends
+
+Usage: python3 bench_embeddings.py [onnx_model_dir]
+The onnx backend is skipped when no model directory is given (argument or
+RAG_EMBEDDING_MODEL_DIR), the default backend when Chroma cannot load its model.
+"""
+
+import sys
+import os
+import time
+import random
+
+# Add the scripts directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+from embeddings import get_embedding_function
+
+TEXT_COUNT = 512
+BATCH_SIZES = (1, 8, 32, 128)
+THREADS = sorted({1, os.cpu_count() or 1})
+
+WORDS = ("hello robot what do you see today I love pizza and music the weather is nice "
+         "can you follow me please tell me a story about my family and friends").split()
+
+def generate_texts(count):
+    rng = random.Random(0)
+    return [f"User: {' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 30)))}\nRobot: ok"
+            for _ in range(count)]
+
+def measure(embedding_function, texts, batch_size):
+    """Return texts per second when embedding in batches of batch_size"""
+    embedding_function(texts[:batch_size])  # Warm up (model load, allocations)
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        embedding_function(texts[i:i + batch_size])
+    return len(texts) / (time.perf_counter() - start)
+
+def report(label, embedding_function, texts):
+    rates = [f"b{batch_size}: {measure(embedding_function, texts, batch_size):8.1f}/s" for batch_size in BATCH_SIZES]
+    print(f"{label:<24} | " + " | ".join(rates))
+
+if __name__ == "__main__":
+    texts = generate_texts(TEXT_COUNT)
+    model_dir = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("RAG_EMBEDDING_MODEL_DIR")
+
+    print(f"🚀 Embedding throughput on {TEXT_COUNT} texts\n")
+
+    report("hashing", get_embedding_function("hashing"), texts)
+
+    if model_dir:
+        for threads in THREADS:
+            # The onnx backend batches internally, so use a large internal batch
+            embedding_function = get_embedding_function("onnx", model_dir=model_dir, batch_size=128, threads=threads)
+            report(f"onnx ({threads} threads)", embedding_function, texts)
+    else:
+        print("onnx                     | skipped (no model directory)")
+
+    try:
+        from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+        report("default (chroma)", DefaultEmbeddingFunction(), texts)
+    except Exception as e:
+        print(f"default (chroma)         | skipped ({e})")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Emotion inference benchmark
+
+Builds synthetic frames with 1 to N faces and measures the per-frame latency
+of detect_basic_emotions against the face count: heuristics, the model run
+face by face, and the model run as one batch. The model rows need --model (or
+EMOTION_MODEL) pointing at a local .onnx or OpenCV DNN file.
+
+Usage: python3 bench_emotions.py [--model=emotion.onnx] [--faces=1,2,4,8,16] [--repeats=20] [--json=report.json]
+"""
+
+import sys
+import os
+import json
+import time
+import statistics
+
+import numpy as np
+
+# Add the scripts directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+from emotion_model import get_emotion_classifier
+from face_recognition import detect_basic_emotions
+from cli_options import split_options
+
+FACE_SIZE = 96
+
+def synthetic_frame(face_count, seed=0):
+    """Noise frame with face_count non-overlapping face boxes on a grid"""
+    rng = np.random.RandomState(seed)
+    columns = int(np.ceil(np.sqrt(face_count)))
+    size = columns * FACE_SIZE * 2
+    image = rng.randint(0, 256, (size, size, 3), dtype=np.uint8)
+    faces = np.array([[(i % columns) * FACE_SIZE * 2, (i // columns) * FACE_SIZE * 2, FACE_SIZE, FACE_SIZE]
+                      for i in range(face_count)])
+    return image, faces
+
+def median_ms(function, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main():
+    _, options = split_options(sys.argv[1:])
+    if "model" in options:
+        os.environ["EMOTION_MODEL"] = options["model"]
+    face_counts = [int(count) for count in str(options.get("faces", "1,2,4,8,16")).split(",")]
+    repeats = int(options.get("repeats", 20))
+
+    classifier = get_emotion_classifier()
+    print(f"🚀 Emotion benchmark, model: {os.environ.get('EMOTION_MODEL') or 'none (heuristics only)'}\n")
+
+    report = []
+    for count in face_counts:
+        image, faces = synthetic_frame(count)
+        entry = {"faces": count, "heuristic_ms": median_ms(lambda: detect_basic_emotions(image, faces), repeats)}
+        if classifier is not None:
+            detect_basic_emotions(image, faces, classifier)  # Warm up
+            entry["model_per_face_ms"] = median_ms(
+                lambda: [classifier.predict(image, faces[i:i + 1]) for i in range(len(faces))], repeats)
+            entry["model_batch_ms"] = median_ms(lambda: detect_basic_emotions(image, faces, classifier), repeats)
+        report.append(entry)
+
+        line = f"📊 {count:>3} faces | heuristic {entry['heuristic_ms']:7.2f}ms"
+        if classifier is not None:
+            line += f" | model per face {entry['model_per_face_ms']:7.2f}ms | model batch {entry['model_batch_ms']:7.2f}ms"
+        print(line)
+
+    if "json" in options:
+        with open(options["json"], "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Fork server start-up benchmark
+
+For every entry point the Node server spawns, compares a fresh
+`python3 script.py` with the same call through forkserver.py. Scripts are
+called without arguments so they stop at their usage message: what is
+measured is interpreter start-up and imports, not the work itself.
+
+Usage: python3 bench_forkserver.py [--repeats=5] [--scripts=tts,script] [--json=report.json]
+"""
+
+import sys
+import os
+import json
+import time
+import statistics
+import subprocess
+import tempfile
+
+# Add the scripts directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import forkserver
+from cli_options import split_options
+
+def wait_for_socket(path, timeout=120):
+    deadline = time.time() + timeout
+    while not os.path.exists(path):
+        if time.time() > deadline:
+            raise TimeoutError("Fork server did not start")
+        time.sleep(0.05)
+
+def main():
+    _, options = split_options(sys.argv[1:])
+    repeats = int(options.get("repeats", 5))
+    scripts = str(options.get("scripts", ",".join(forkserver.SCRIPTS))).split(",")
+
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="forkserver_bench_"), "forkserver.sock")
+    server = subprocess.Popen([sys.executable, os.path.join(forkserver.SCRIPTS_DIR, "forkserver.py")],
+                              env=dict(os.environ, FORKSERVER_SOCKET=socket_path), stderr=subprocess.DEVNULL)
+    try:
+        started = time.perf_counter()
+        wait_for_socket(socket_path)
+        print(f"🚀 Fork server ready in {time.perf_counter() - started:.2f}s, {repeats} runs per script\n")
+
+        report = {}
+        for name in scripts:
+            path = os.path.join(forkserver.SCRIPTS_DIR, f"{name}.py")
+            cold, warm = [], []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                subprocess.run([sys.executable, path], capture_output=True)
+                cold.append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                forkserver.run(f"{name}.py", socket_path=socket_path)
+                warm.append((time.perf_counter() - start) * 1000)
+
+            report[name] = {"spawn_ms": statistics.median(cold), "forkserver_ms": statistics.median(warm)}
+            print(f"📊 {name:>16} | spawn {report[name]['spawn_ms']:8.1f}ms | "
+                  f"fork server {report[name]['forkserver_ms']:7.1f}ms | "
+                  f"x{report[name]['spawn_ms'] / max(report[name]['forkserver_ms'], 1e-3):.1f}")
+
+        if "json" in options:
+            with open(options["json"], "w") as f:
+                json.dump(report, f, indent=2)
+
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+RAG scale and recall benchmark
+
+Generates a synthetic multi-user corpus with planted facts, grows the store
+through several sizes and, at each size, measures add_conversation throughput,
+search p50/p95 latency per search mode and recall@k of the planted facts.
+Facts are only planted while filling the smallest size, so later sizes
+measure how well the same facts are found once buried under more turns.
+Runs fully offline in a temporary data dir with the hashing embedder unless
+RAG_EMBEDDING_BACKEND says otherwise.
+
+Usage: python3 bench_rag.py [--sizes=1000,10000] [--users=50] [--k=5]
+                            [--modes=vector,lexical,hybrid] [--queries=200] [--json=report.json]
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import shutil
+import tempfile
+
+# Add the scripts directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+from cli_options import split_options
+from embeddings import get_embedding_function
+from rag_service import SimpleRAGService
+
+FILLER = ("hello robot what do you see today the weather is nice can you move forward "
+          "tell me a joke I am tired let's play a game turn left stop please thank you "
+          "good morning good night how are you fine").split()
+
+# Planted facts: (statement, question) templates sharing the topic words
+FACTS = [
+    ("My sister lives in {value}", "Where does my sister live?"),
+    ("My favourite dessert is {value}", "What dessert do I like the most?"),
+    ("I parked the bicycle next to {value}", "Where did I leave my bicycle?"),
+    ("The doctor appointment is on {value}", "When is my doctor appointment?"),
+    ("My cat is called {value}", "What is the name of my cat?"),
+    ("I am learning the {value} language", "Which language am I studying?"),
+]
+VALUES = ["Lisbon", "tiramisu", "the bakery", "Tuesday", "Miso", "Japanese", "Oslo", "churros",
+          "the library", "Friday", "Pixel", "Italian"]
+
+def generate_turn(rng):
+    return " ".join(rng.choice(FILLER) for _ in range(rng.randint(3, 12)))
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+class Corpus:
+    """Synthetic conversations: Zipf-like user sizes plus one fact per topic and user
+
+    Facts are planted among the first plant_until turns only (all turns when None).
+    """
+
+    def __init__(self, users, plant_until=None, seed=42):
+        self.rng = random.Random(seed)
+        self.users = [f"user_{i}" for i in range(users)]
+        self.weights = [1.0 / (rank + 1) for rank in range(users)]
+        self.ground_truth = []  # (user_id, question, conversation_id)
+        self.planted = set()
+        self.plant_until = plant_until
+        self.counter = 0
+
+    def next_turn(self):
+        """Return (conversation_id, user_id, message, response)"""
+        user_id = self.rng.choices(self.users, self.weights)[0]
+        conv_id = f"bench_{self.counter}"
+        self.counter += 1
+
+        # Plant each fact once per user, early enough to be buried by later turns
+        fact_index = self.rng.randrange(len(FACTS))
+        early = self.plant_until is None or self.counter <= self.plant_until
+        if early and (user_id, fact_index) not in self.planted and self.rng.random() < 0.05:
+            self.planted.add((user_id, fact_index))
+            statement, question = FACTS[fact_index]
+            self.ground_truth.append((user_id, question, conv_id))
+            return conv_id, user_id, statement.format(value=self.rng.choice(VALUES)), "I will remember that."
+
+        return conv_id, user_id, generate_turn(self.rng), generate_turn(self.rng)
+
+def measure_size(rag, corpus, modes, k, queries):
+    """Search latency and recall@k per mode over the planted facts"""
+    sample = corpus.ground_truth
+    if len(sample) > queries:
+        sample = random.Random(0).sample(sample, queries)
+
+    results = {}
+    for mode in modes:
+        latencies = []
+        hits = 0
+        for user_id, question, conv_id in sample:
+            start = time.perf_counter()
+            found = rag.search_conversations(question, user_id, k, mode)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += any(result['id'] == conv_id for result in found)
+
+        results[mode] = {
+            "p50_ms": percentile(latencies, 0.50) if latencies else 0.0,
+            "p95_ms": percentile(latencies, 0.95) if latencies else 0.0,
+            f"recall@{k}": hits / len(sample) if sample else 0.0,
+            "queries": len(sample)
+        }
+    return results
+
+def main():
+    _, options = split_options(sys.argv[1:])
+    sizes = [int(size) for size in str(options.get("sizes", "1000,10000")).split(",")]
+    modes = str(options.get("modes", "vector,lexical,hybrid")).split(",")
+    users = int(options.get("users", 50))
+    k = int(options.get("k", 5))
+    queries = int(options.get("queries", 200))
+
+    data_dir = tempfile.mkdtemp(prefix="rag_bench_")
+    try:
+        embedding_function = get_embedding_function(os.environ.get("RAG_EMBEDDING_BACKEND", "hashing"))
+        rag = SimpleRAGService(data_dir=data_dir, embedding_function=embedding_function)
+        corpus = Corpus(users, plant_until=min(sizes))
+
+        print(f"🚀 RAG benchmark: {users} users, sizes {sizes}, modes {modes}, k={k}\n")
+        report = []
+        for size in sorted(sizes):
+            added = size - corpus.counter
+            start = time.perf_counter()
+            while corpus.counter < size:
+                conv_id, user_id, message, response = corpus.next_turn()
+                rag.add_conversation(conv_id, message, response, user_id)
+            ingest_seconds = time.perf_counter() - start
+
+            entry = {
+                "size": size,
+                "ingest_per_second": added / ingest_seconds if ingest_seconds > 0 else 0.0,
+                "planted_facts": len(corpus.ground_truth),
+                "modes": measure_size(rag, corpus, modes, k, queries)
+            }
+            report.append(entry)
+
+            print(f"📊 {size} memories | ingest {entry['ingest_per_second']:.0f}/s | {entry['planted_facts']} planted facts")
+            for mode, stats in entry["modes"].items():
+                print(f"   {mode:>7} | p50 {stats['p50_ms']:7.2f}ms | p95 {stats['p95_ms']:7.2f}ms | "
+                      f"recall@{k} {stats[f'recall@{k}']:.3f}")
+
+        if "json" in options:
+            with open(options["json"], "w") as f:
+                json.dump(report, f, indent=2)
+
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
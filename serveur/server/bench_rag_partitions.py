@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark RAG search latency with skewed user sizes across partition modes
+"""
+
+import sys
+import os
+import time
+import random
+import shutil
+import tempfile
+import statistics
+
+# Add the scripts directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+from embeddings import HashingEmbeddingFunction
+from rag_service import SimpleRAGService
+
+HEAVY_USER_SIZE = 20000
+LIGHT_USERS = 20
+LIGHT_USER_SIZE = 50
+QUERIES_PER_USER = 20
+
+WORDS = ("pizza guitar music robot camera school football garden coffee movie "
+         "travel book weather dog cat piano work family holiday science").split()
+
+def random_sentence(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(8))
+
+def populate(rag, users, rng):
+    """Insert every user's conversations in batches"""
+    for user_id, size in users.items():
+        collection = rag.get_partition(user_id)
+        for start in range(0, size, 1000):
+            count = min(1000, size - start)
+            messages = [random_sentence(rng) for _ in range(count)]
+            collection.add(
+                ids=[f"{user_id}_{start + i}" for i in range(count)],
+                documents=[f"User: {m}\nRobot: ok" for m in messages],
+                metadatas=[{"user_id": user_id, "message": m, "response": "ok",
+                            "timestamp": "2024-01-01T00:00:00"} for m in messages]
+            )
+
+def measure(rag, user_ids, rng):
+    latencies = []
+    for user_id in user_ids:
+        for _ in range(QUERIES_PER_USER):
+            start = time.perf_counter()
+            rag.search_conversations(random_sentence(rng), user_id, 5)
+            latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+def run_mode(mode):
+    data_dir = tempfile.mkdtemp(prefix=f"rag_bench_{mode}_")
+    try:
+        rng = random.Random(42)
+        rag = SimpleRAGService(data_dir=data_dir, partition_mode=mode,
+                               embedding_function=HashingEmbeddingFunction())
+
+        users = {"heavy_user": HEAVY_USER_SIZE}
+        users.update({f"light_user_{i}": LIGHT_USER_SIZE for i in range(LIGHT_USERS)})
+
+        start = time.perf_counter()
+        populate(rag, users, rng)
+        ingest_seconds = time.perf_counter() - start
+
+        light = measure(rag, [u for u in users if u != "heavy_user"], rng)
+        heavy = measure(rag, ["heavy_user"], rng)
+
+        print(f"{mode:>7} | ingest {ingest_seconds:6.1f}s | "
+              f"light p50 {light[0]:6.2f}ms p95 {light[1]:6.2f}ms | "
+              f"heavy p50 {heavy[0]:6.2f}ms p95 {heavy[1]:6.2f}ms")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    print("🚀 RAG partition benchmark")
+    print(f"   1 heavy user x {HEAVY_USER_SIZE}, {LIGHT_USERS} light users x {LIGHT_USER_SIZE}\n")
+    for mode in ("shared", "hashed", "user"):
+        run_mode(mode)
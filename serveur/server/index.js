@@ -298,22 +298,76 @@ app.post('/api/chat', async (req, res) => {
     }
 });
 
+// Envoie un fichier audio au Raspberry Pi puis le supprime
+async function sendAudioToRasp(outputPath) {
+    try {
+        const audioData = await fs.readFile(outputPath);
+
+        await axios.post(`${RASP_URL}/infer`, {
+            audioData: audioData.toString('base64')
+        }, {
+            headers: { 'Content-Type': 'application/json' }
+        });
+    } finally {
+        fs.unlink(outputPath).catch(() => {});
+    }
+}
+
+// Synthétise phrase par phrase et envoie chaque morceau dès qu'il est prêt, dans l'ordre
+async function generateSpeechStream(text) {
+    return new Promise((resolve, reject) => {
+        const pythonProcess = spawn('python3', ['./scripts/tts.py', text, '--stream']);
+
+        let pending = '';
+        let sending = Promise.resolve();
+
+        pythonProcess.stdout.on('data', (data) => {
+            pending += data.toString();
+            const lines = pending.split('\n');
+            pending = lines.pop();
+
+            for (const line of lines.filter(l => l.trim())) {
+                let chunk;
+                try {
+                    chunk = JSON.parse(line);
+                } catch (parseError) {
+                    console.error('Error parsing TTS chunk:', parseError);
+                    continue;
+                }
+                // Chain sends so the Pi receives sentences in order
+                sending = sending
+                    .then(() => sendAudioToRasp(chunk.path))
+                    .catch((error) => console.error('Audio processing error:', error));
+            }
+        });
+
+        pythonProcess.stderr.on('data', (data) => {
+            console.error('TTS error:', data.toString());
+        });
+
+        pythonProcess.on('close', (code) => {
+            if (code !== 0) {
+                reject(new Error(`TTS process exited with code ${code}`));
+                return;
+            }
+            sending.then(resolve);
+        });
+    });
+}
+
 // Convertit le texte en audio via script Python TTS et l'envoie au Raspberry Pi
 async function generateSpeech(text) {
+    if (process.env.TTS_STREAM === '1') {
+        return generateSpeechStream(text);
+    }
+
     return new Promise((resolve, reject) => {
         const pythonProcess = spawn('python3', ['./scripts/tts.py', text]);
 
-        pythonProcess.stdout.on('data', async () => {
+        // tts.py prints a per-request output path, served from its audio cache when possible
+        pythonProcess.stdout.on('data', async (data) => {
             try {
-                const audioData = await fs.readFile('output.mp3');
-                const base64Data = audioData.toString('base64');
-
-                await axios.post(`${RASP_URL}/infer`, {
-                    audioData: base64Data
-                }, {
-                    headers: { 'Content-Type': 'application/json' }
-                });
-
+                await sendAudioToRasp(data.toString().trim());
                 resolve();
             } catch (error) {
                 console.error('Audio processing error:', error);
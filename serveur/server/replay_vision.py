@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Vision replay runner
+
+Feeds recorded footage (a video file or a directory of images) through the
+detection and face stages and writes one JSON line per processed frame.
+In native mode frames arrive at the footage frame rate and, like on the robot,
+frames that arrive while a previous one is still being analyzed are dropped.
+In max mode every frame is processed as fast as possible. Prints throughput,
+latency percentiles and dropped-frame counts at the end.
+
+Usage: python3 replay_vision.py <video_file|image_dir> [--speed=native|max] [--stages=detect,faces]
+                                [--fps=10] [--limit=N] [--output=results.jsonl] [--json=summary.json]
+"""
+
+import sys
+import os
+import json
+import time
+
+import cv2
+
+# Add the scripts directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+from letterbox import letterbox
+from cli_options import split_options
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+DEFAULT_FPS = 10.0  # Image directories carry no frame rate
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+class FrameSource:
+    """Random-forward access to the frames of a video or an image directory"""
+
+    def __init__(self, path, fps=None):
+        if os.path.isdir(path):
+            self.files = sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.lower().endswith(IMAGE_EXTENSIONS))
+            self.capture = None
+            self.count = len(self.files)
+            self.fps = fps or DEFAULT_FPS
+        else:
+            self.files = None
+            self.capture = cv2.VideoCapture(path)
+            if not self.capture.isOpened():
+                raise ValueError(f"Could not open video: {path}")
+            self.count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.fps = fps or self.capture.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+            self.position = 0
+
+    def read(self, index):
+        """Frame at index; indices must not go backwards for videos"""
+        if self.files is not None:
+            return cv2.imread(self.files[index])
+        # Skipped frames are grabbed without being decoded
+        while self.position < index:
+            self.capture.grab()
+            self.position += 1
+        ok, frame = self.capture.read()
+        self.position += 1
+        return frame if ok else None
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.release()
+
+def detection_stage():
+    """YOLO objects, people and navigation, as enhanced_detect.py"""
+    import enhanced_detect
+
+    net, classes, output_layers = enhanced_detect.load_yolo_model()
+    if net is None:
+        raise ValueError("Could not load YOLO model")
+
+    def run(frame):
+        processed_frame, _ = letterbox(frame)
+        detection = enhanced_detect.detect_objects_enhanced(processed_frame, net, classes, output_layers)
+        return {
+            'objects': detection['objects'],
+            'people_count': detection['people_count'],
+            'navigation': enhanced_detect.generate_navigation_instruction(
+                detection['people_positions'], processed_frame.shape[1], processed_frame.shape[0])
+        }
+    return run
+
+def face_stage():
+    """Faces, recognition and emotions, as face_recognition.py"""
+    import face_recognition
+    from emotion_model import get_emotion_classifier
+
+    face_cascade = face_recognition.load_face_cascade()
+    if face_cascade is None:
+        raise ValueError("Could not load face detection model")
+    known_faces = face_recognition.load_known_faces()
+    classifier = get_emotion_classifier()
+
+    def run(frame):
+        faces = face_recognition.detect_faces(frame, face_cascade)
+        recognized_people, unknown_count = face_recognition.recognize_faces(frame, faces, known_faces)
+        return {
+            'total_faces': len(faces),
+            'known_people': [person['name'] for person in recognized_people],
+            'unknown_people': unknown_count,
+            'emotions': face_recognition.detect_basic_emotions(frame, faces, classifier)
+        }
+    return run
+
+STAGES = {
+    'detect': detection_stage,
+    'faces': face_stage
+}
+
+def replay(source, stages, native=True, limit=None, output=None):
+    """Process the footage, returns the summary dict"""
+    count = min(source.count, limit) if limit else source.count
+    latencies = []
+    stage_latencies = {name: [] for name in stages}
+    processed = dropped = unreadable = 0
+
+    started_at = time.perf_counter()
+    index = 0
+    while index < count:
+        if native:
+            # Frame i arrives at i / fps; wait for it, or jump to the newest one that has arrived
+            now = time.perf_counter()
+            available_at = started_at + index / source.fps
+            if now < available_at:
+                time.sleep(available_at - now)
+            else:
+                newest = min(int((now - started_at) * source.fps), count - 1)
+                if newest > index:
+                    dropped += newest - index
+                    index = newest
+                    available_at = started_at + index / source.fps
+        else:
+            available_at = time.perf_counter()
+
+        frame = source.read(index)
+        if frame is None:
+            unreadable += 1
+            index += 1
+            continue
+
+        results = {}
+        stage_ms = {}
+        for name, run in stages.items():
+            stage_start = time.perf_counter()
+            results[name] = run(frame)
+            stage_ms[name] = (time.perf_counter() - stage_start) * 1000
+            stage_latencies[name].append(stage_ms[name])
+
+        latency_ms = (time.perf_counter() - available_at) * 1000
+        latencies.append(latency_ms)
+        processed += 1
+        if output:
+            output.write(json.dumps({
+                'frame': index,
+                'source_time': round(index / source.fps, 3),
+                'latency_ms': round(latency_ms, 2),
+                'stage_ms': {name: round(value, 2) for name, value in stage_ms.items()},
+                'results': results
+            }) + "\n")
+        index += 1
+
+    elapsed = time.perf_counter() - started_at
+    summary = {
+        'frames': count,
+        'processed': processed,
+        'dropped': dropped,
+        'unreadable': unreadable,
+        'seconds': round(elapsed, 3),
+        'throughput_fps': round(processed / elapsed, 2) if elapsed > 0 else 0.0,
+        'source_fps': source.fps
+    }
+    if latencies:
+        summary['latency_ms'] = {f'p{int(q * 100)}': round(percentile(latencies, q), 2) for q in (0.5, 0.95, 0.99)}
+        summary['stage_p50_ms'] = {name: round(percentile(values, 0.5), 2)
+                                   for name, values in stage_latencies.items() if values}
+    return summary
+
+def main():
+    args, options = split_options(sys.argv[1:])
+    if len(args) != 1:
+        print("Usage: python3 replay_vision.py <video_file|image_dir> [--speed=native|max] [--stages=detect,faces]")
+        print("                                [--fps=10] [--limit=N] [--output=results.jsonl] [--json=summary.json]")
+        sys.exit(1)
+
+    speed = options.get("speed", "native")
+    stage_names = str(options.get("stages", "detect,faces")).split(",")
+    unknown = [name for name in stage_names if name not in STAGES]
+    if speed not in ("native", "max") or unknown:
+        print(f"Unknown speed or stages: {speed} {unknown}", file=sys.stderr)
+        sys.exit(1)
+
+    stages = {}
+    for name in stage_names:
+        try:
+            stages[name] = STAGES[name]()
+        except Exception as e:
+            print(f"Error loading stage {name}: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    source = FrameSource(args[0], float(options["fps"]) if "fps" in options else None)
+    output_path = options.get("output")
+    output = open(output_path, "w") if output_path and output_path is not True else None
+    try:
+        print(f"🚀 Replaying {args[0]}: {source.count} frames at {source.fps:.1f} fps, {speed} speed, stages {stage_names}")
+        summary = replay(source, stages, speed == "native", int(options["limit"]) if "limit" in options else None, output)
+    finally:
+        source.close()
+        if output:
+            output.close()
+
+    print(f"📊 {summary['processed']}/{summary['frames']} frames processed, {summary['dropped']} dropped, "
+          f"{summary['throughput_fps']} fps")
+    if 'latency_ms' in summary:
+        print(f"   latency p50 {summary['latency_ms']['p50']}ms | p95 {summary['latency_ms']['p95']}ms | "
+              f"p99 {summary['latency_ms']['p99']}ms | stages p50 {summary['stage_p50_ms']}")
+
+    if "json" in options:
+        with open(options["json"], "w") as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
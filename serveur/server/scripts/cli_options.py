@@ -0,0 +1,18 @@
+def split_options(args):
+    """Separate --name[=value] options from positional arguments
+
+    Everything after a bare "--" is positional, so raw user text starting
+    with "--" is not read as an option.
+    """
+    positional = []
+    options = {}
+    for index, arg in enumerate(args):
+        if arg == "--":
+            positional.extend(args[index + 1:])
+            break
+        if arg.startswith("--"):
+            name, _, value = arg[2:].partition("=")
+            options[name] = value or True
+        else:
+            positional.append(arg)
+    return positional, options
@@ -1,44 +1,42 @@
 import cv2
 import numpy as np
 import sys
+import json
 
-def resize_frame(image,height = 416 ,width = 416) : 
-    
-    # Récupérer les dimensions de l'image d'origine
-    hauteur, largeur = image.shape[:2]
-
-    # Calculer le ratio de redimensionnement pour maintenir le rapport hauteur/largeur
-    ratio = min(height / largeur, width / hauteur)
-
-    # Calculer les nouvelles dimensions de l'image en conservant le rapport hauteur/largeur
-    nouvelle_largeur = int(largeur * ratio)
-    nouvelle_hauteur = int(hauteur * ratio)
-
-    # Redimensionner l'image en conservant le rapport hauteur/largeur
-    image_redimensionnee = cv2.resize(image, (nouvelle_largeur, nouvelle_hauteur))
-
-    # Créer un arrière-plan noir de taille 416x416
-    arriere_plan = 255 * np.ones((416, 416, 3), dtype=np.uint8)
-
-    # Calculer les coordonnées pour placer l'image redimensionnée au centre de l'arrière-plan
-    x_offset = (416 - nouvelle_largeur) // 2
-    y_offset = (416 - nouvelle_hauteur) // 2
+import vision_cache
+from frame_ring import decode_frame, read_source
+from letterbox import letterbox
+from profiling import profiled, span
 
-    # Placer l'image redimensionnée au centre de l'arrière-plan
-    arriere_plan[y_offset:y_offset + nouvelle_hauteur, x_offset:x_offset + nouvelle_largeur] = image_redimensionnee
+@span("letterbox")
+def resize_frame(image,height = 416 ,width = 416) : 
+    # Letterbox partagé avec le prétraitement côté Raspberry Pi (letterbox.py)
+    return letterbox(image, width, height)[0]
 
-    return arriere_plan
+WEIGHTS_PATH = "./scripts/yolov4.weights"
+CONFIG_PATH = "./scripts/cfg/yolov4.cfg"
+CLASSES_PATH = "./scripts/coco.names"
 
-# chargement des poids du modèle , YOLO V4
-net = cv2.dnn.readNet("./scripts/yolov4.weights", "./scripts/cfg/yolov4.cfg")
+net = None
 classes = []
-with open("./scripts/coco.names", "r") as f:
-    classes = [line.strip() for line in f.readlines()]
-layer_names = net.getLayerNames()
-output_layers = [layer_names[i - 1] for i in net.getUnconnectedOutLayers()]
-
-
+output_layers = []
+
+@span("load_model")
+def load_model():
+    # chargement des poids du modèle , YOLO V4, une seule fois et seulement quand une image doit être analysée
+    global net, classes, output_layers
+    if net is not None:
+        return
+    net = cv2.dnn.readNet(WEIGHTS_PATH, CONFIG_PATH)
+    with open(CLASSES_PATH, "r") as f:
+        classes = [line.strip() for line in f.readlines()]
+    layer_names = net.getLayerNames()
+    output_layers = [layer_names[i - 1] for i in net.getUnconnectedOutLayers()]
+
+
+@span("detect")
 def detect_objects(frame, closest = False, low_resolution = False):
+    load_model()
     if low_resolution : 
         frame = resize_frame(frame)
 
@@ -174,10 +172,24 @@ def detect_objects(frame, closest = False, low_resolution = False):
 
     return '{"angle":"'+str(angle)+'", "instruction":"'+instruction+'"}'
 
-if __name__ == "__main__":
+def main():
     if len(sys.argv) != 2:
-        print("Usage: python3 detect.py <image_file>")
+        print("Usage: python3 detect.py <image_file|shm:ring_name>")
         sys.exit(1)
 
-    image = cv2.imread(sys.argv[1])
-    print(detect_objects(image, True, False))
\ No newline at end of file
+    # Une image inchangée est servie depuis le cache, sans décodage ni inférence
+    image_bytes, image = read_source(sys.argv[1])
+    cache_key = vision_cache.cache_key(image_bytes, "detect:1:" + vision_cache.file_version(WEIGHTS_PATH))
+    cached = vision_cache.get(cache_key)
+    if cached is not None:
+        print(json.dumps(cached))
+        return
+
+    result = json.loads(detect_objects(decode_frame(image_bytes, image), True, False))
+    result['cached'] = False
+    vision_cache.put(cache_key, result)
+    print(json.dumps(result))
+
+if __name__ == "__main__":
+    with profiled("detect"):
+        main()
\ No newline at end of file
@@ -0,0 +1,138 @@
+import hashlib
+import os
+
+import numpy as np
+from chromadb import EmbeddingFunction
+
+try:
+    from chromadb.utils.embedding_functions import register_embedding_function
+except ImportError:  # chromadb < 1.0 has no embedding function registry
+    def register_embedding_function(cls):
+        return cls
+
+from lexical_index import tokenize
+
+# Backends: Chroma's implicit default model, a local ONNX model, or feature hashing
+EMBEDDING_BACKENDS = ("default", "onnx", "hashing")
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_HASHING_DIMENSIONS = 384
+MAX_TOKENS = 256
+
+def normalize_rows(vectors):
+    """L2-normalize each row, leaving all-zero rows untouched"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+@register_embedding_function
+class HashingEmbeddingFunction(EmbeddingFunction):
+    """Deterministic signed feature hashing, needs no model and no network"""
+
+    def __init__(self, dimensions=DEFAULT_HASHING_DIMENSIONS):
+        self.dimensions = int(dimensions)
+
+    def __call__(self, input):
+        vectors = np.zeros((len(input), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(input):
+            for token in tokenize(text):
+                # Stable across processes, unlike the built-in hash()
+                digest = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+                vectors[row, digest % self.dimensions] += 1.0 if digest >> 63 else -1.0
+        return list(normalize_rows(vectors))
+
+    @staticmethod
+    def name():
+        return "dynami_hashing"
+
+    def default_space(self):
+        return "cosine"
+
+    def get_config(self):
+        return {"dimensions": self.dimensions}
+
+    @staticmethod
+    def build_from_config(config):
+        return HashingEmbeddingFunction(config.get("dimensions", DEFAULT_HASHING_DIMENSIONS))
+
+@register_embedding_function
+class LocalOnnxEmbeddingFunction(EmbeddingFunction):
+    """Sentence embeddings from a local ONNX model directory (model.onnx + tokenizer.json)"""
+
+    def __init__(self, model_dir, batch_size=DEFAULT_BATCH_SIZE, threads=None):
+        self.model_dir = os.path.abspath(model_dir)
+        self.batch_size = int(batch_size)
+        self.threads = int(threads) if threads else None
+
+        # Optional dependencies, both are installed alongside chromadb
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(self.model_dir, "model.onnx")
+        tokenizer_path = os.path.join(self.model_dir, "tokenizer.json")
+        for path in (model_path, tokenizer_path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Embedding model file not found: {path}")
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=MAX_TOKENS)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")  # Pad to the longest text of the batch
+
+        options = onnxruntime.SessionOptions()
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+            options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def __call__(self, input):
+        embeddings = []
+        for start in range(0, len(input), self.batch_size):
+            encoded = self.tokenizer.encode_batch(list(input[start:start + self.batch_size]))
+            input_ids = np.array([e.ids for e in encoded], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.zeros_like(input_ids)
+            hidden = self.session.run(None, {k: v for k, v in feeds.items() if k in self.input_names})[0]
+
+            # Mean pooling over real tokens
+            mask = attention_mask[:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            embeddings.extend(normalize_rows(pooled.astype(np.float32)))
+        return embeddings
+
+    @staticmethod
+    def name():
+        return "dynami_local_onnx"
+
+    def default_space(self):
+        return "cosine"
+
+    def get_config(self):
+        return {"model_dir": self.model_dir, "batch_size": self.batch_size, "threads": self.threads}
+
+    @staticmethod
+    def build_from_config(config):
+        return LocalOnnxEmbeddingFunction(config["model_dir"], config.get("batch_size", DEFAULT_BATCH_SIZE),
+                                          config.get("threads"))
+
+def get_embedding_function(backend=None, model_dir=None, batch_size=None, threads=None, dimensions=None):
+    """Build the configured embedding function, None meaning Chroma's default"""
+    backend = backend or os.environ.get("RAG_EMBEDDING_BACKEND", "default")
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}")
+
+    if backend == "hashing":
+        return HashingEmbeddingFunction(dimensions or os.environ.get("RAG_EMBEDDING_DIMENSIONS", DEFAULT_HASHING_DIMENSIONS))
+
+    if backend == "onnx":
+        model_dir = model_dir or os.environ.get("RAG_EMBEDDING_MODEL_DIR")
+        if not model_dir:
+            raise ValueError("RAG_EMBEDDING_MODEL_DIR is required for the onnx embedding backend")
+        return LocalOnnxEmbeddingFunction(
+            model_dir,
+            batch_size or os.environ.get("RAG_EMBEDDING_BATCH_SIZE", DEFAULT_BATCH_SIZE),
+            threads or os.environ.get("RAG_EMBEDDING_THREADS")
+        )
+
+    return None
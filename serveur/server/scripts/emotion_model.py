@@ -0,0 +1,101 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+# FER+ layout by default: 64x64 grayscale, raw 0-255 pixels, eight classes
+DEFAULT_LABELS = ("neutral", "happy", "surprised", "sad", "angry", "disgusted", "fearful", "contempt")
+DEFAULT_INPUT_SIZE = 64
+
+
+def softmax(logits):
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class EmotionClassifier:
+    """Classifies every face of a frame in one forward pass of a local model
+
+    .onnx files run with onnxruntime when it is installed, anything else (or
+    ONNX without onnxruntime) goes through OpenCV DNN.
+    """
+
+    def __init__(self, model_path, labels=DEFAULT_LABELS, input_size=DEFAULT_INPUT_SIZE, channels=1,
+                 scale=1.0, mean=0.0):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Emotion model file not found: {model_path}")
+        self.labels = list(labels)
+        self.input_size = int(input_size)
+        self.channels = int(channels)
+        self.scale = float(scale)
+        self.mean = float(mean)
+
+        self.session = None
+        self.net = None
+        if model_path.endswith(".onnx"):
+            try:
+                import onnxruntime
+            except ImportError:
+                onnxruntime = None
+            if onnxruntime is not None:
+                self.session = onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+                model_input = self.session.get_inputs()[0]
+                self.input_name = model_input.name
+                # Models exported with a fixed batch of 1 are run face by face
+                self.fixed_batch = model_input.shape[0] == 1
+        if self.session is None:
+            self.net = cv2.dnn.readNet(model_path)
+
+    def preprocess(self, image, faces):
+        """Crop, resize and normalize every face into one NCHW float32 batch"""
+        batch = np.empty((len(faces), self.channels, self.input_size, self.input_size), dtype=np.float32)
+        for i, (x, y, w, h) in enumerate(faces):
+            crop = image[max(0, y):y + h, max(0, x):x + w]
+            if self.channels == 1:
+                crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)[:, :, np.newaxis]
+            crop = cv2.resize(crop, (self.input_size, self.input_size), interpolation=cv2.INTER_AREA)
+            batch[i] = crop.reshape(self.input_size, self.input_size, self.channels).transpose(2, 0, 1)
+        return (batch - self.mean) * self.scale
+
+    def forward(self, batch):
+        if self.net is not None:
+            self.net.setInput(batch)
+            return np.asarray(self.net.forward()).reshape(len(batch), -1)
+        if self.fixed_batch:
+            return np.concatenate([self.session.run(None, {self.input_name: batch[i:i + 1]})[0]
+                                   for i in range(len(batch))]).reshape(len(batch), -1)
+        return np.asarray(self.session.run(None, {self.input_name: batch})[0]).reshape(len(batch), -1)
+
+    def predict(self, image, faces):
+        """Return one (emotion, confidence) per face"""
+        if len(faces) == 0:
+            return []
+        scores = self.forward(self.preprocess(image, faces))
+        # Accept models that end with logits as well as with probabilities
+        if scores.min() < 0 or not np.allclose(scores.sum(axis=1), 1.0, atol=1e-3):
+            scores = softmax(scores)
+        best = scores.argmax(axis=1)
+        return [(self.labels[index] if index < len(self.labels) else f"class_{index}", float(scores[row, index]))
+                for row, index in enumerate(best)]
+
+
+def get_emotion_classifier():
+    """Classifier configured by EMOTION_MODEL, None when unset or unusable"""
+    model_path = os.environ.get("EMOTION_MODEL")
+    if not model_path:
+        return None
+    labels = os.environ.get("EMOTION_LABELS")
+    try:
+        return EmotionClassifier(
+            model_path,
+            labels.split(",") if labels else DEFAULT_LABELS,
+            os.environ.get("EMOTION_INPUT_SIZE", DEFAULT_INPUT_SIZE),
+            os.environ.get("EMOTION_INPUT_CHANNELS", 1),
+            os.environ.get("EMOTION_INPUT_SCALE", 1.0),
+            os.environ.get("EMOTION_INPUT_MEAN", 0.0)
+        )
+    except Exception as e:
+        print(f"Error loading emotion model: {e}", file=sys.stderr)
+        return None
@@ -3,30 +3,28 @@ import numpy as np
 import sys
 import json
 
-def resize_frame(image, height=416, width=416):
-    """Resize frame while maintaining aspect ratio"""
-    hauteur, largeur = image.shape[:2]
-    ratio = min(height / largeur, width / hauteur)
-
-    nouvelle_largeur = int(largeur * ratio)
-    nouvelle_hauteur = int(hauteur * ratio)
-
-    image_redimensionnee = cv2.resize(image, (nouvelle_largeur, nouvelle_hauteur))
+import vision_cache
+from frame_ring import decode_frame, read_source
+from letterbox import DETECTOR_SIZE, letterbox, read_jpeg_metadata, to_original_box
+from profiling import profiled, span
 
-    # Create white background instead of black for better detection
-    arriere_plan = 255 * np.ones((416, 416, 3), dtype=np.uint8)
-
-    x_offset = (416 - nouvelle_largeur) // 2
-    y_offset = (416 - nouvelle_hauteur) // 2
+@span("letterbox")
+def resize_frame(image, height=416, width=416):
+    """Resize frame while maintaining aspect ratio, on a white background"""
+    return letterbox(image, width, height)[0]
 
-    arriere_plan[y_offset:y_offset + nouvelle_hauteur, x_offset:x_offset + nouvelle_largeur] = image_redimensionnee
+WEIGHTS_PATH = "./scripts/yolov4.weights"
+CONFIG_PATH = "./scripts/cfg/yolov4.cfg"
 
-    return arriere_plan
+def cache_version():
+    """Results change with the model files and the detection code"""
+    return "enhanced_detect:1:" + vision_cache.file_version(WEIGHTS_PATH, CONFIG_PATH)
 
+@span("load_model")
 def load_yolo_model():
     """Load YOLO model with error handling"""
     try:
-        net = cv2.dnn.readNet("./scripts/yolov4.weights", "./scripts/cfg/yolov4.cfg")
+        net = cv2.dnn.readNet(WEIGHTS_PATH, CONFIG_PATH)
 
         with open("./scripts/coco.names", "r") as f:
             classes = [line.strip() for line in f.readlines()]
@@ -39,15 +37,22 @@ def load_yolo_model():
         print(f"Error loading YOLO model: {e}", file=sys.stderr)
         return None, None, None
 
-def detect_objects_enhanced(frame, net, classes, output_layers, confidence_threshold=0.5):
-    """Enhanced object detection that detects all objects, not just people"""
-    height, width, channels = frame.shape
+def make_blob(frame):
+    """Network input for a letterboxed frame"""
+    return cv2.dnn.blobFromImage(frame, 0.00392, (416, 416), (0, 0, 0), True, crop=False)
 
-    # Create blob from image
-    blob = cv2.dnn.blobFromImage(frame, 0.00392, (416, 416), (0, 0, 0), True, crop=False)
+def run_network(net, output_layers, blob):
     net.setInput(blob)
-    outs = net.forward(output_layers)
+    return net.forward(output_layers)
 
+@span("detect")
+def detect_objects_enhanced(frame, net, classes, output_layers, confidence_threshold=0.5):
+    """Enhanced object detection that detects all objects, not just people"""
+    outs = run_network(net, output_layers, make_blob(frame))
+    return parse_detections(outs, classes, frame.shape[1], frame.shape[0], confidence_threshold)
+
+def parse_detections(outs, classes, width, height, confidence_threshold=0.5):
+    """Boxes, non-maximum suppression and people positions from the network outputs"""
     # Information to show on screen
     class_ids = []
     confidences = []
@@ -194,14 +199,22 @@ def generate_scene_description(detection_result):
 
 def main():
     if len(sys.argv) != 2:
-        print("Usage: python3 enhanced_detect.py <image_file>")
+        print("Usage: python3 enhanced_detect.py <image_file|shm:ring_name>")
         sys.exit(1)
 
     image_path = sys.argv[1]
 
     try:
-        # Load image
-        image = cv2.imread(image_path)
+        # Load image, an unchanged frame is answered from the cache without decoding
+        image_bytes, image = read_source(image_path)
+        cache_key = vision_cache.cache_key(image_bytes, cache_version())
+        cached = vision_cache.get(cache_key)
+        if cached is not None:
+            print(json.dumps(cached))
+            return
+
+        from_file = image is None  # Ring frames are already letterboxed, without metadata
+        image = decode_frame(image_bytes, image)
         if image is None:
             raise ValueError("Could not load image")
 
@@ -210,8 +223,12 @@ def main():
         if net is None:
             raise ValueError("Could not load YOLO model")
 
-        # Resize frame for better detection
-        processed_frame = resize_frame(image)
+        # Frames letterboxed on the Pi carry their metadata, only resize the others
+        letterbox_metadata = read_jpeg_metadata(image_bytes) if from_file else None
+        if letterbox_metadata and image.shape[:2] == (DETECTOR_SIZE, DETECTOR_SIZE):
+            processed_frame = image
+        else:
+            processed_frame, letterbox_metadata = letterbox(image)
 
         # Perform detection
         detection_result = detect_objects_enhanced(processed_frame, net, classes, output_layers)
@@ -234,9 +251,14 @@ def main():
             'scene_description': scene_description,
             'navigation': navigation,
             'object_counts': count_objects_by_type(detection_result['objects']),
-            'timestamp': str(np.datetime64('now'))
+            'people_boxes': [to_original_box(person['box'], letterbox_metadata)
+                             for person in detection_result['people_positions']],
+            'letterbox': letterbox_metadata,
+            'timestamp': str(np.datetime64('now')),
+            'cached': False
         }
 
+        vision_cache.put(cache_key, result)
         print(json.dumps(result))
 
     except Exception as e:
@@ -252,4 +274,5 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with profiled("enhanced_detect"):
+        main()
\ No newline at end of file
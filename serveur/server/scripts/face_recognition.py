@@ -3,7 +3,14 @@ import numpy as np
 import sys
 import json
 import os
+import time
 
+import vision_cache
+from emotion_model import get_emotion_classifier
+from frame_ring import decode_frame, read_source
+from profiling import profiled, span
+
+@span("load_cascade")
 def load_face_cascade():
     """Load OpenCV face detection cascade"""
     try:
@@ -14,6 +21,7 @@ def load_face_cascade():
         print(f"Error loading face cascade: {e}", file=sys.stderr)
         return None
 
+@span("detect_faces")
 def detect_faces(image, face_cascade):
     """Detect faces in the image"""
     try:
@@ -55,14 +63,17 @@ def extract_face_features(image, face_rect):
         print(f"Error extracting face features: {e}", file=sys.stderr)
         return None
 
+FACES_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'faces.json')
+
+def cache_version():
+    """Results change with the known faces (learn_face.py), the emotion model and the recognition code"""
+    return "face_recognition:1:" + vision_cache.file_version(FACES_FILE, os.environ.get("EMOTION_MODEL", ""))
+
 def load_known_faces():
     """Load known faces from data file"""
     try:
-        data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
-        faces_file = os.path.join(data_dir, 'faces.json')
-
-        if os.path.exists(faces_file):
-            with open(faces_file, 'r') as f:
+        if os.path.exists(FACES_FILE):
+            with open(FACES_FILE, 'r') as f:
                 return json.load(f)
         else:
             return {}
@@ -92,6 +103,7 @@ def compare_faces(features1, features2):
         print(f"Error comparing faces: {e}", file=sys.stderr)
         return 0.0
 
+@span("recognize")
 def recognize_faces(image, faces, known_faces, threshold=0.6):
     """Recognize faces against known database"""
     recognized_people = []
@@ -125,8 +137,36 @@ def recognize_faces(image, faces, known_faces, threshold=0.6):
 
     return recognized_people, unknown_count
 
-def detect_basic_emotions(image, faces):
-    """Basic emotion detection using simple heuristics"""
+def heuristic_emotion(face_gray):
+    """Very basic emotion estimation based on facial brightness/contrast"""
+    mean_brightness = np.mean(face_gray)
+    contrast = np.std(face_gray)
+
+    if mean_brightness > 140 and contrast > 40:
+        return "happy", 0.6
+    elif mean_brightness < 100:
+        return "sad", 0.5
+    elif contrast > 50:
+        return "surprised", 0.5
+    else:
+        return "neutral", 0.7
+
+@span("emotions")
+def detect_basic_emotions(image, faces, classifier=None):
+    """Emotion per face: one batched model pass when a classifier is configured, heuristics otherwise"""
+    if classifier is not None and len(faces) > 0:
+        try:
+            predictions = classifier.predict(image, faces)
+            return [{
+                'person': f'Person {i+1}',
+                'emotion': emotion,
+                'confidence': round(confidence, 3),
+                'position': face_rect.tolist(),
+                'source': 'model'
+            } for i, (face_rect, (emotion, confidence)) in enumerate(zip(faces, predictions))]
+        except Exception as e:
+            print(f"Error running emotion model, falling back to heuristics: {e}", file=sys.stderr)
+
     emotions = []
 
     for i, face_rect in enumerate(faces):
@@ -136,30 +176,14 @@ def detect_basic_emotions(image, faces):
 
             # Convert to grayscale
             face_gray = cv2.cvtColor(face_region, cv2.COLOR_BGR2GRAY)
-
-            # Simple heuristic: analyze brightness and contrast
-            mean_brightness = np.mean(face_gray)
-            contrast = np.std(face_gray)
-
-            # Very basic emotion estimation based on facial brightness/contrast
-            if mean_brightness > 140 and contrast > 40:
-                emotion = "happy"
-                confidence = 0.6
-            elif mean_brightness < 100:
-                emotion = "sad"
-                confidence = 0.5
-            elif contrast > 50:
-                emotion = "surprised"
-                confidence = 0.5
-            else:
-                emotion = "neutral"
-                confidence = 0.7
+            emotion, confidence = heuristic_emotion(face_gray)
 
             emotions.append({
                 'person': f'Person {i+1}',
                 'emotion': emotion,
                 'confidence': confidence,
-                'position': face_rect.tolist()
+                'position': face_rect.tolist(),
+                'source': 'heuristic'
             })
 
         except Exception as e:
@@ -168,21 +192,29 @@ def detect_basic_emotions(image, faces):
                 'person': f'Person {i+1}',
                 'emotion': 'unknown',
                 'confidence': 0.0,
-                'position': face_rect.tolist()
+                'position': face_rect.tolist(),
+                'source': 'heuristic'
             })
 
     return emotions
 
 def main():
     if len(sys.argv) != 2:
-        print("Usage: python3 face_recognition.py <image_file>")
+        print("Usage: python3 face_recognition.py <image_file|shm:ring_name>")
         sys.exit(1)
 
     image_path = sys.argv[1]
 
     try:
-        # Load image
-        image = cv2.imread(image_path)
+        # Load image, an unchanged frame is answered from the cache without decoding
+        image_bytes, image = read_source(image_path)
+        cache_key = vision_cache.cache_key(image_bytes, cache_version())
+        cached = vision_cache.get(cache_key)
+        if cached is not None:
+            print(json.dumps(cached))
+            return
+
+        image = decode_frame(image_bytes, image)
         if image is None:
             raise ValueError("Could not load image")
 
@@ -200,8 +232,11 @@ def main():
         # Recognize faces
         recognized_people, unknown_count = recognize_faces(image, faces, known_faces)
 
-        # Detect basic emotions
-        emotions = detect_basic_emotions(image, faces)
+        # Detect emotions, all faces in one batch when a model is configured
+        classifier = get_emotion_classifier()  # Loaded before timing, the latency covers inference only
+        emotion_started_at = time.perf_counter()
+        emotions = detect_basic_emotions(image, faces, classifier)
+        emotion_latency_ms = round((time.perf_counter() - emotion_started_at) * 1000, 2)
 
         # Prepare result
         result = {
@@ -211,9 +246,12 @@ def main():
             'recognized_details': recognized_people,
             'unknown_people': unknown_count,
             'emotions': emotions,
-            'face_positions': [face.tolist() for face in faces]
+            'emotion_latency_ms': emotion_latency_ms,
+            'face_positions': [face.tolist() for face in faces],
+            'cached': False
         }
 
+        vision_cache.put(cache_key, result)
         print(json.dumps(result))
 
     except Exception as e:
@@ -231,4 +269,5 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with profiled("face_recognition"):
+        main()
\ No newline at end of file
@@ -0,0 +1,52 @@
+import os
+import time
+import uuid
+
+
+def write_atomic(path, write):
+    """Call write(temporary_path), then move the file in place
+
+    Concurrent readers never see a partial file, and nothing is left behind
+    when write fails.
+    """
+    temporary_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        write(temporary_path)
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+def mark_used(path):
+    """Record a hit for LRU eviction, keeping the mtime that dates the entry
+
+    Raises FileNotFoundError when the entry was evicted concurrently.
+    """
+    os.utime(path, (time.time(), os.path.getmtime(path)))
+
+
+def evict(cache_dir, max_bytes, suffix, keep=None):
+    """Delete least recently used entries until the cache fits in max_bytes"""
+    entries = []
+    total = 0
+    for name in os.listdir(cache_dir):
+        if not name.endswith(suffix):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue  # Evicted concurrently by another request
+        total += stat.st_size
+        if path != keep:
+            entries.append((stat.st_atime, stat.st_size, path))
+
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except FileNotFoundError:
+            pass  # Evicted concurrently by another request
@@ -0,0 +1,169 @@
+import importlib
+import io
+import json
+import os
+import runpy
+import signal
+import socket
+import sys
+import traceback
+
+from profiling import profiled
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SOCKET_PATH = os.environ.get("FORKSERVER_SOCKET", "/tmp/dynami_forkserver.sock")
+
+# Entry points called by the Node server, imported once so children start warm
+SCRIPTS = ["enhanced_detect", "detect", "face_recognition", "learn_face", "rag_service", "tts", "script"]
+HEAVY_MODULES = ["numpy", "cv2", "chromadb", "speech_recognition"]
+
+
+def preload(scripts=SCRIPTS):
+    """Import heavy dependencies and the scripts themselves, returns the loaded scripts"""
+    sys.path.insert(0, SCRIPTS_DIR)
+    for name in HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"Error preloading {name}: {e}", file=sys.stderr)
+
+    loaded = {}
+    for name in scripts:
+        try:
+            module = importlib.import_module(name)
+        except Exception as e:
+            # Still served, the child runs the file from scratch
+            print(f"Error preloading {name}: {e}", file=sys.stderr)
+            continue
+        if hasattr(module, "load_model"):
+            # Models loaded lazily by the script are loaded here so children inherit them
+            try:
+                module.load_model()
+            except Exception as e:
+                print(f"Error preloading the {name} model: {e}", file=sys.stderr)
+        if hasattr(module, "main"):
+            loaded[name] = module
+    return loaded
+
+
+def read_request(conn):
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    return json.loads(data)
+
+
+def run_script(loaded, script, argv, stdin_text="", request_id=None):
+    """Run a script's main() as its CLI would, returns (exit code, stdout, stderr)"""
+    name = os.path.splitext(os.path.basename(script))[0]
+    stdout, stderr = io.StringIO(), io.StringIO()
+    sys.stdout, sys.stderr, sys.stdin = stdout, stderr, io.StringIO(stdin_text)
+    sys.argv = [os.path.join(SCRIPTS_DIR, f"{name}.py")] + list(argv)
+
+    code = 0
+    try:
+        with profiled(name, request_id):
+            if name in loaded:
+                loaded[name].main()
+            else:
+                runpy.run_path(sys.argv[0], run_name="__main__")
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        if e.code is not None and not isinstance(e.code, int):
+            print(e.code, file=stderr)
+    except BaseException:
+        traceback.print_exc(file=stderr)
+        code = 1
+    finally:
+        sys.stdout, sys.stderr, sys.stdin = sys.__stdout__, sys.__stderr__, sys.__stdin__
+    return code, stdout.getvalue(), stderr.getvalue()
+
+
+def handle(conn, loaded):
+    """Child side: run one request and answer {"code", "stdout", "stderr"}
+
+    The script runs in the caller's working directory and environment, sent
+    with the request, rather than the fork server's. Module-level settings
+    read at preload time keep the server's values.
+    """
+    try:
+        request = read_request(conn)
+        if request.get("cwd"):
+            os.chdir(request["cwd"])
+        os.environ.update(request.get("env", {}))
+        code, stdout, stderr = run_script(loaded, request["script"], request.get("argv", []), request.get("stdin", ""),
+                                          request.get("request_id"))
+    except Exception as e:
+        code, stdout, stderr = 1, "", f"Invalid request: {e}\n"
+    conn.sendall((json.dumps({"code": code, "stdout": stdout, "stderr": stderr}) + "\n").encode('utf-8'))
+    conn.close()
+
+
+def serve(socket_path=SOCKET_PATH, scripts=SCRIPTS):
+    """Preload, then fork one child per connection
+
+    Each connection sends one JSON line {"script", "argv", "stdin", "request_id",
+    "cwd", "env"} and gets one JSON line back. Streaming modes (tts.py --stream, script.py --worker)
+    should keep being spawned directly.
+    """
+    loaded = preload(scripts)
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)  # Children are reaped automatically
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(16)
+    print(f"Fork server ready on {socket_path} ({', '.join(sorted(loaded))} preloaded)", file=sys.stderr)
+
+    try:
+        while True:
+            conn, _ = server.accept()
+            if os.fork() == 0:
+                server.close()
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)  # Let scripts wait on their own subprocesses
+                try:
+                    handle(conn, loaded)
+                finally:
+                    os._exit(0)
+            conn.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        os.remove(socket_path)
+
+
+def run(script, argv=(), stdin_text="", socket_path=SOCKET_PATH, request_id=None):
+    """Client side: run a script through the fork server, returns (code, stdout, stderr)
+
+    The script sees this process's working directory and environment.
+    """
+    request = {"script": script, "argv": list(argv), "stdin": stdin_text, "request_id": request_id,
+               "cwd": os.getcwd(), "env": dict(os.environ)}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(socket_path)
+        conn.sendall((json.dumps(request) + "\n").encode('utf-8'))
+        response = read_request(conn)
+    return response["code"], response["stdout"], response["stderr"]
+
+
+def main():
+    if len(sys.argv) >= 3 and sys.argv[1] == "run":
+        code, stdout, stderr = run(sys.argv[2], sys.argv[3:], request_id=os.environ.get("PROFILE_REQUEST_ID"))
+        sys.stdout.write(stdout)
+        sys.stderr.write(stderr)
+        sys.exit(code)
+
+    if len(sys.argv) != 1:
+        print("Usage: python3 forkserver.py                        (start the server)")
+        print("       python3 forkserver.py run <script.py> [args...]")
+        sys.exit(1)
+
+    serve()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import os
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import cv2
+import numpy as np
+
+from letterbox import DETECTOR_SIZE, letterbox
+
+RING_NAME = os.environ.get("FRAME_RING_NAME", "dynami_frames")
+RING_SLOTS = int(os.environ.get("FRAME_RING_SLOTS", 4))
+SHM_PREFIX = "shm:"
+
+MAGIC = 0x44594E46  # "DYNF"
+HEADER_FIELDS = 8   # magic, slots, height, width, channels, latest sequence, spare, spare
+WRITING = -1        # Slot sequence while the producer is overwriting it
+
+created_here = set()  # Rings owned by this process
+
+
+class Frame:
+    """A decoded frame: sequence number, capture timestamp and a numpy view"""
+
+    def __init__(self, seq, timestamp, image):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.image = image
+
+
+class FrameRing:
+    """Fixed-slot ring of decoded frames in shared memory
+
+    Layout: an int64 header, then per-slot int64 sequence numbers and float64
+    timestamps, then the uint8 frames. The producer marks a slot as being
+    written, copies the frame, then publishes its sequence number, so readers
+    can tell a slot that was overwritten while they were using it.
+    """
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        if self.header[0] != MAGIC:
+            raise ValueError(f"Shared memory {shm.name} is not a frame ring")
+        slots, height, width, channels = (int(value) for value in self.header[1:5])
+
+        offset = HEADER_FIELDS * 8
+        self.seqs = np.ndarray((slots,), dtype=np.int64, buffer=shm.buf, offset=offset)
+        offset += slots * 8
+        self.timestamps = np.ndarray((slots,), dtype=np.float64, buffer=shm.buf, offset=offset)
+        offset += slots * 8
+        self.frames = np.ndarray((slots, height, width, channels), dtype=np.uint8, buffer=shm.buf, offset=offset)
+        self.slots = slots
+
+    @classmethod
+    def create(cls, name=RING_NAME, slots=RING_SLOTS, shape=(DETECTOR_SIZE, DETECTOR_SIZE, 3)):
+        """Producer side: allocate the ring, replacing a stale one with the same name"""
+        size = (HEADER_FIELDS + 2 * slots) * 8 + slots * int(np.prod(shape))
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = [MAGIC, slots, shape[0], shape[1], shape[2], 0, 0, 0]
+        del header  # Views must not outlive close()
+        created_here.add(shm._name)
+        ring = cls(shm, owner=True)
+        ring.seqs[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name=RING_NAME):
+        """Consumer side: map an existing ring"""
+        shm = shared_memory.SharedMemory(name=name)
+        if shm._name not in created_here:
+            # Only the producer owns the segment, do not let this process unlink it at exit
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, owner=False)
+
+    @property
+    def latest_seq(self):
+        return int(self.header[5])
+
+    def write(self, image, timestamp=None):
+        """Copy one frame into the next slot, returns its sequence number"""
+        seq = self.latest_seq + 1
+        slot = seq % self.slots
+        self.seqs[slot] = WRITING
+        self.frames[slot] = image
+        self.timestamps[slot] = time.time() if timestamp is None else timestamp
+        self.seqs[slot] = seq
+        self.header[5] = seq
+        return seq
+
+    def read(self, seq):
+        """Zero-copy Frame for a sequence number, None if it is gone or not written yet"""
+        slot = seq % self.slots
+        if seq <= 0 or self.seqs[slot] != seq:
+            return None
+        timestamp = float(self.timestamps[slot])
+        if self.seqs[slot] != seq:
+            return None
+        return Frame(seq, timestamp, self.frames[slot])
+
+    def is_valid(self, frame):
+        """False once the producer has started overwriting the frame's slot"""
+        return self.seqs[frame.seq % self.slots] == frame.seq
+
+    def latest(self):
+        """Newest complete frame, or None when nothing was written"""
+        for _ in range(self.slots):
+            frame = self.read(self.latest_seq)
+            if frame is not None or self.latest_seq == 0:
+                return frame
+        return None
+
+    def close(self):
+        # Drop the numpy views first, the mapping cannot close while they exist
+        self.header = self.seqs = self.timestamps = self.frames = None
+        self.shm.close()
+        if self.owner:
+            created_here.discard(self.shm._name)
+            self.shm.unlink()
+
+
+class FrameConsumer:
+    """Follows a ring, always jumping to the newest frame and counting the ones skipped"""
+
+    def __init__(self, ring):
+        self.ring = ring
+        self.last_seq = 0
+        self.stats = {"frames": 0, "dropped": 0, "overwritten": 0}
+
+    def next(self, timeout=None, poll_interval=0.002):
+        """Newest frame not seen yet, waiting up to timeout; None on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.ring.latest_seq > self.last_seq:
+                frame = self.ring.latest()
+                if frame is not None and frame.seq > self.last_seq:
+                    if self.last_seq:
+                        self.stats["dropped"] += frame.seq - self.last_seq - 1
+                    self.last_seq = frame.seq
+                    self.stats["frames"] += 1
+                    return frame
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_interval)
+
+    def done(self, frame):
+        """Call after processing: returns False, and counts it, if the frame was overwritten meanwhile"""
+        if self.ring.is_valid(frame):
+            return True
+        self.stats["overwritten"] += 1
+        return False
+
+
+def ring_name(source):
+    """Ring name of a "shm:<name>" source, "shm:" alone meaning the default ring"""
+    return source[len(SHM_PREFIX):] or RING_NAME
+
+
+def load_frame(source):
+    """Read an image file, or the newest ring frame for a "shm:<name>" source"""
+    if not source.startswith(SHM_PREFIX):
+        return cv2.imread(source)
+
+    ring = FrameRing.attach(ring_name(source))
+    frame = ring.latest()
+    # Copy so the image survives closing the mapping and later overwrites
+    image = None if frame is None else frame.image.copy()
+    frame = None
+    ring.close()
+    return image
+
+
+def read_source(source):
+    """Return (frame bytes, image): raw file bytes undecoded, or a ring frame and its pixels"""
+    if source.startswith(SHM_PREFIX):
+        image = load_frame(source)
+        return (b"" if image is None else image.tobytes()), image
+    with open(source, 'rb') as f:
+        return f.read(), None
+
+
+def decode_frame(frame_bytes, image=None):
+    """Decode file bytes from read_source, unless the image is already decoded"""
+    if image is not None:
+        return image
+    return cv2.imdecode(np.frombuffer(frame_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def produce(source, name=RING_NAME, slots=RING_SLOTS):
+    """Decode a camera or video source once and publish letterboxed frames"""
+    capture = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    ring = FrameRing.create(name, slots)
+    print(f"Publishing {source} to {SHM_PREFIX}{name}", file=sys.stderr)
+    try:
+        while True:
+            ok, image = capture.read()
+            if not ok:
+                break
+            ring.write(letterbox(image)[0])
+    except KeyboardInterrupt:
+        pass
+    finally:
+        capture.release()
+        ring.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python3 frame_ring.py <camera_index|video_file> [ring_name]")
+        sys.exit(1)
+
+    produce(sys.argv[1], *sys.argv[2:])
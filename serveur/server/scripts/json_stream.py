@@ -0,0 +1,54 @@
+import codecs
+import json
+
+CHUNK_SIZE = 1 << 16
+
+def iter_json_array(path, start_offset=0, chunk_size=CHUNK_SIZE):
+    """Yield (item, end_offset) for each element of a top-level JSON array
+
+    Only one chunk plus the current element is held in memory. end_offset is the
+    byte offset right after the element; passing it back as start_offset resumes
+    the parse with the next element.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+
+    with open(path, "rb") as f:
+        f.seek(start_offset)
+        offset = start_offset  # Byte offset of buffer[0] in the file
+        buffer = ""
+        pos = 0
+        started = start_offset > 0  # Resuming means we are already inside the array
+        eof = False
+
+        while True:
+            # Skip whitespace, separators and the opening bracket, refilling as needed
+            while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] == ","
+                                         or (buffer[pos] == "[" and not started)):
+                started = started or buffer[pos] == "["
+                pos += 1
+
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+
+            if pos < len(buffer):
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    item = None  # Element continues in the next chunk
+                else:
+                    if end < len(buffer) or eof:
+                        offset += len(buffer[:end].encode("utf-8"))
+                        buffer = buffer[end:]
+                        pos = 0
+                        yield item, offset
+                        continue
+                    # A number could be cut at the chunk boundary, read more to be sure
+
+            if eof:
+                return
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer += utf8.decode(chunk, final=eof)
@@ -4,6 +4,8 @@ import sys
 import json
 import os
 
+from profiling import profiled, span
+
 def load_face_cascade():
     """Load OpenCV face detection cascade"""
     try:
@@ -13,6 +15,7 @@ def load_face_cascade():
         print(f"Error loading face cascade: {e}", file=sys.stderr)
         return None
 
+@span("detect_face")
 def detect_largest_face(image, face_cascade):
     """Detect the largest face in the image"""
     try:
@@ -36,6 +39,7 @@ def detect_largest_face(image, face_cascade):
         print(f"Error detecting face: {e}", file=sys.stderr)
         return None
 
+@span("encode_face")
 def extract_face_encoding(image, face_rect):
     """Extract face encoding from the face region"""
     try:
@@ -129,6 +133,7 @@ def load_faces_database():
         print(f"Error loading faces database: {e}", file=sys.stderr)
         return {}
 
+@span("save_database")
 def save_faces_database(faces_db):
     """Save faces database"""
     try:
@@ -214,4 +219,5 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with profiled("learn_face"):
+        main()
\ No newline at end of file
@@ -0,0 +1,185 @@
+import math
+import os
+import re
+import sqlite3
+from collections import Counter
+
+from reranking import to_epoch
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text):
+    """Lowercase word tokens, ignoring very short words like the JS fallback does"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if len(token) > 2]
+
+class LexicalIndex:
+    """Incremental BM25 inverted index stored in SQLite next to the Chroma data"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.conn = sqlite3.connect(path, timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS docs (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                message TEXT,
+                response TEXT,
+                timestamp TEXT,
+                epoch REAL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                user_id TEXT NOT NULL,
+                term TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (user_id, term, doc_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+            CREATE TABLE IF NOT EXISTS user_stats (
+                user_id TEXT PRIMARY KEY,
+                doc_count INTEGER NOT NULL,
+                total_length INTEGER NOT NULL
+            );
+        """)
+
+        # Indexes created before time-window filters have no epoch column
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(docs)")]
+        if "epoch" not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE docs ADD COLUMN epoch REAL")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS docs_user_epoch ON docs (user_id, epoch)")
+
+    def add(self, records):
+        """Index (id, user_id, message, response, timestamp) tuples, replacing existing ids"""
+        with self.conn:
+            self._remove([record[0] for record in records])
+            for doc_id, user_id, message, response, timestamp in records:
+                terms = Counter(tokenize(f"{message} {response}"))
+                length = sum(terms.values())
+
+                self.conn.execute(
+                    "INSERT INTO docs (id, user_id, length, message, response, timestamp, epoch) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (doc_id, user_id, length, message, response, timestamp, to_epoch(timestamp))
+                )
+                self.conn.executemany(
+                    "INSERT INTO postings (user_id, term, doc_id, tf) VALUES (?, ?, ?, ?)",
+                    [(user_id, term, doc_id, tf) for term, tf in terms.items()]
+                )
+                self.conn.execute(
+                    "INSERT INTO user_stats (user_id, doc_count, total_length) VALUES (?, 1, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET doc_count = doc_count + 1, total_length = total_length + excluded.total_length",
+                    (user_id, length)
+                )
+
+    def remove(self, ids):
+        """Remove documents from the index"""
+        with self.conn:
+            self._remove(ids)
+
+    def _remove(self, ids):
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT user_id, COUNT(*), SUM(length) FROM docs WHERE id IN ({placeholders}) GROUP BY user_id",
+                batch
+            ).fetchall()
+            for user_id, count, total_length in rows:
+                self.conn.execute(
+                    "UPDATE user_stats SET doc_count = doc_count - ?, total_length = total_length - ? WHERE user_id = ?",
+                    (count, total_length, user_id)
+                )
+            self.conn.execute(f"DELETE FROM postings WHERE doc_id IN ({placeholders})", batch)
+            self.conn.execute(f"DELETE FROM docs WHERE id IN ({placeholders})", batch)
+
+    def remove_user(self, user_id):
+        """Remove every document of a user"""
+        with self.conn:
+            self.conn.execute("DELETE FROM postings WHERE user_id = ?", (user_id,))
+            self.conn.execute("DELETE FROM docs WHERE user_id = ?", (user_id,))
+            self.conn.execute("DELETE FROM user_stats WHERE user_id = ?", (user_id,))
+
+    def backfill_epochs(self):
+        """Fill the epoch of documents indexed before the column existed"""
+        rows = self.conn.execute("SELECT id, timestamp FROM docs WHERE epoch IS NULL").fetchall()
+        updates = [(to_epoch(timestamp), doc_id) for doc_id, timestamp in rows]
+        updates = [update for update in updates if update[0] is not None]
+        with self.conn:
+            self.conn.executemany("UPDATE docs SET epoch = ? WHERE id = ?", updates)
+        return len(updates)
+
+    def set_times(self, times):
+        """Overwrite the timestamp and epoch of (id, timestamp, epoch) documents, returns how many were indexed"""
+        with self.conn:
+            cursor = self.conn.executemany("UPDATE docs SET timestamp = ?, epoch = ? WHERE id = ?",
+                                           [(timestamp, epoch, doc_id) for doc_id, timestamp, epoch in times])
+        return max(cursor.rowcount, 0)
+
+    def count(self, user_id=None):
+        """Number of indexed documents"""
+        if user_id:
+            row = self.conn.execute("SELECT doc_count FROM user_stats WHERE user_id = ?", (user_id,)).fetchone()
+            return row[0] if row else 0
+        return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def search(self, query, user_id, n_results=5, since=None, until=None):
+        """Return [(doc, score)] ranked by BM25 for a user's documents, optionally in [since, until)"""
+        terms = list(set(tokenize(query)))
+        stats = self.conn.execute(
+            "SELECT doc_count, total_length FROM user_stats WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if not terms or not stats or stats[0] <= 0:
+            return []
+
+        doc_count, total_length = stats
+        avg_length = total_length / doc_count or 1.0
+
+        # Only documents in the window are scored, length statistics cover the whole history
+        window = ""
+        window_args = []
+        if since is not None:
+            window += " AND d.epoch >= ?"
+            window_args.append(since)
+        if until is not None:
+            window += " AND d.epoch < ?"
+            window_args.append(until)
+
+        placeholders = ",".join("?" * len(terms))
+        postings = self.conn.execute(
+            f"SELECT p.term, p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.doc_id "
+            f"WHERE p.user_id = ? AND p.term IN ({placeholders}){window}",
+            [user_id] + terms + window_args
+        ).fetchall()
+
+        document_frequency = Counter(term for term, _, _, _ in postings)
+        scores = {}
+        for term, doc_id, tf, length in postings:
+            df = document_frequency[term]
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length))
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n_results]
+        if not ranked:
+            return []
+
+        placeholders = ",".join("?" * len(ranked))
+        docs = {
+            row[0]: {'id': row[0], 'user_id': row[1], 'message': row[2], 'response': row[3], 'timestamp': row[4]}
+            for row in self.conn.execute(
+                f"SELECT id, user_id, message, response, timestamp FROM docs WHERE id IN ({placeholders})",
+                [doc_id for doc_id, _ in ranked]
+            )
+        }
+        return [(docs[doc_id], score) for doc_id, score in ranked if doc_id in docs]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,140 @@
+import contextlib
+import cProfile
+import json
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(DATA_DIR, 'profiles'))
+MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", 50))
+MAX_BYTES = int(os.environ.get("PROFILE_MAX_BYTES", 20 * 1024 * 1024))
+FEATURES = ("cprofile", "memory", "spans")
+TOP_ALLOCATIONS = 10
+
+active = None  # Session of the running invocation, None when profiling is off
+
+
+def enabled_features(value=None):
+    """Parse DYNAMI_PROFILE: "1"/"all" or a comma list of cprofile,memory,spans"""
+    value = os.environ.get("DYNAMI_PROFILE", "") if value is None else value
+    value = value.strip().lower()
+    if value in ("", "0", "false", "off"):
+        return set()
+    if value in ("1", "true", "on", "all"):
+        return set(FEATURES)
+    return {feature for feature in value.split(",") if feature in FEATURES}
+
+
+class Session:
+    """Profiling data for one script invocation"""
+
+    def __init__(self, name, features, request_id):
+        self.name = name
+        self.features = features
+        self.request_id = request_id
+        self.spans = []
+        self.started_at = time.perf_counter()
+        self.profiler = cProfile.Profile() if "cprofile" in features else None
+        self.trace_memory = "memory" in features and not tracemalloc.is_tracing()
+
+    def start(self):
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.profiler:
+            self.profiler.enable()
+
+    def stop(self, profile_dir=PROFILE_DIR):
+        """Write the dumps, returns the paths written"""
+        if self.profiler:
+            self.profiler.disable()
+
+        summary = {
+            'script': self.name,
+            'request_id': self.request_id,
+            'wall_ms': round((time.perf_counter() - self.started_at) * 1000, 2),
+            'spans': self.spans
+        }
+        if self.trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            summary['peak_bytes'] = peak
+            summary['top_allocations'] = [
+                {'location': str(stat.traceback), 'bytes': stat.size, 'count': stat.count}
+                for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]
+            ]
+
+        os.makedirs(profile_dir, exist_ok=True)
+        base = os.path.join(profile_dir, f"{self.name}-{self.request_id}-{int(time.time() * 1000)}")
+        paths = [f"{base}.json"]
+        with open(paths[0], 'w') as f:
+            json.dump(summary, f, indent=2)
+        if self.profiler:
+            paths.append(f"{base}.prof")
+            self.profiler.dump_stats(paths[1])
+
+        prune(profile_dir)
+        return paths
+
+
+def prune(profile_dir=PROFILE_DIR, max_files=MAX_FILES, max_bytes=MAX_BYTES):
+    """Delete the oldest dumps until the directory fits the count and size caps"""
+    entries = []
+    for name in os.listdir(profile_dir):
+        path = os.path.join(profile_dir, name)
+        if name.endswith(('.json', '.prof')):
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    while entries and (len(entries) > max_files or total > max_bytes):
+        _, size, path = entries.pop(0)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # Pruned concurrently by another invocation
+        total -= size
+
+
+@contextlib.contextmanager
+def profiled(name, request_id=None):
+    """Profile the enclosed block as one invocation when DYNAMI_PROFILE is set"""
+    global active
+    features = enabled_features()
+    if not features or active is not None:
+        yield None
+        return
+
+    request_id = request_id or os.environ.get("PROFILE_REQUEST_ID") or uuid.uuid4().hex[:12]
+    active = Session(name, features, request_id)
+    active.start()
+    try:
+        yield active
+    finally:
+        session, active = active, None
+        try:
+            session.stop()
+        except OSError as e:
+            print(f"Error writing profile: {e}", file=sys.stderr)
+
+
+@contextlib.contextmanager
+def span(name):
+    """Record the wall time of a named stage in the current profile"""
+    if active is None or "spans" not in active.features:
+        yield
+        return
+
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        active.spans.append({
+            'name': name,
+            'start_ms': round((started_at - active.started_at) * 1000, 2),
+            'duration_ms': round((time.perf_counter() - started_at) * 1000, 2)
+        })
@@ -1,34 +1,247 @@
-import chromadb
+import hashlib
 import json
 import sys
 import os
+import time
 from datetime import datetime
 
+import numpy as np
+
+from cli_options import split_options
+from json_stream import iter_json_array
+from lexical_index import LexicalIndex
+from profiling import profiled, span
+from reranking import DEFAULT_MMR_LAMBDA, DEFAULT_RECENCY_WEIGHT, parse_timestamps, rerank, to_epoch
+
+# Number of ids fetched per round-trip when scanning the collection
+PAGE_SIZE = 500
+
+# Conversations ingested per batch during migration
+MIGRATION_BATCH_SIZE = 100
+CHECKPOINT_FINGERPRINT_BYTES = 64  # Bytes before the checkpoint used to detect a rewritten file
+
+SHARED_COLLECTION = "conversations"
+
+# Partitioning modes: one shared collection, one collection per user,
+# or a fixed number of collections users are hashed into
+PARTITION_MODES = ("shared", "user", "hashed")
+DEFAULT_PARTITION_BUCKETS = 16
+
+# Search modes: Chroma embeddings only, BM25 only, or both fused
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+DEFAULT_HYBRID_ALPHA = 0.5  # Weight of the vector score in hybrid mode
+RERANK_CANDIDATE_FACTOR = 4  # Candidates fetched per requested result when re-ranking
+
+# Retention: near-duplicates are merged, old records move to a cold tier
+COLD_SUFFIX = "_cold"
+DEFAULT_DUPLICATE_THRESHOLD = 0.95  # Cosine similarity above which turns are merged
+DEFAULT_COLD_AFTER_DAYS = 30
+
+# Recent-first search looks at this many days before widening to the whole history, 0 disables it
+DEFAULT_RECENT_DAYS = 0
+
+# Reciprocal rank fusion constant used to merge the results of several queries
+FUSION_RRF_K = 60
+
+def cluster_near_duplicates(embeddings, threshold=DEFAULT_DUPLICATE_THRESHOLD):
+    """Greedy single-pass clustering: each row joins the first close enough representative
+
+    Rows should be ordered by priority, the first row of a cluster is its representative.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if len(embeddings) == 0:
+        return []
+    unit = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+
+    representatives = np.empty_like(unit)
+    clusters = []
+    for i, vector in enumerate(unit):
+        if clusters:
+            similarities = representatives[:len(clusters)] @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= threshold:
+                clusters[best].append(i)
+                continue
+        representatives[len(clusters)] = vector
+        clusters.append([i])
+    return clusters
+
+def record_epochs(metadatas):
+    """Epoch of each record, parsed from its timestamp when stored before epochs existed"""
+    epochs = parse_timestamps([metadata.get('timestamp') for metadata in metadatas])
+    for i, metadata in enumerate(metadatas):
+        if isinstance(metadata.get('epoch'), (int, float)):
+            epochs[i] = metadata['epoch']
+    return epochs
+
+def fuse_results(results, n_results, k=FUSION_RRF_K):
+    """Merge per-query result lists with reciprocal rank fusion, one entry per conversation"""
+    fused = {}
+    for query_index, query_results in enumerate(results):
+        for rank, result in enumerate(query_results):
+            entry = fused.get(result['id'])
+            if entry is None:
+                entry = fused[result['id']] = dict(result, fused_score=0.0, queries=[])
+            elif result['similarity'] > entry['similarity']:
+                # Keep the best-matching copy, its scores read like a single-query result
+                entry.update(result)
+            entry['fused_score'] += 1.0 / (k + rank + 1)
+            entry['queries'].append(query_index)
+    return sorted(fused.values(), key=lambda entry: entry['fused_score'], reverse=True)[:n_results]
+
 class SimpleRAGService:
-    def __init__(self, data_dir="../data"):
-        """Initialize ChromaDB with persistent storage"""
+    def __init__(self, data_dir="../data", partition_mode=None, partition_buckets=None,
+                 embedding_function=None):
+        """Initialize ChromaDB with persistent storage
+
+        Chroma and the embedding function are only loaded on first use, so
+        lexical searches neither pay for them nor fail when they are unavailable.
+        """
         self.data_dir = os.path.abspath(data_dir)
         os.makedirs(self.data_dir, exist_ok=True)
 
-        # Initialize ChromaDB with persistent storage
-        self.client = chromadb.PersistentClient(path=os.path.join(self.data_dir, "chroma_db"))
+        # Partitioning can be configured by the Node server through the environment
+        self.partition_mode = partition_mode or os.environ.get("RAG_PARTITION_MODE", "shared")
+        if self.partition_mode not in PARTITION_MODES:
+            raise ValueError(f"Unknown partition mode: {self.partition_mode}")
+        self.partition_buckets = int(partition_buckets or os.environ.get("RAG_PARTITION_BUCKETS", DEFAULT_PARTITION_BUCKETS))
 
-        # Create or get collection for conversations
-        self.collection = self.client.get_or_create_collection(
-            name="conversations",
-            metadata={"description": "DynAmi conversation memories"}
-        )
+        self.embedding_function = embedding_function
+        self._collection_kwargs = None
+        self._client = None
+
+        # Collection handles, the shared one included, opened lazily
+        self.partitions = {}
+
+        # BM25 index kept in sync with the collections, usable without embeddings
+        self.lexical = LexicalIndex(os.path.join(self.data_dir, "lexical_index.sqlite3"))
+        self.search_mode = os.environ.get("RAG_SEARCH_MODE", "vector")
+        self.hybrid_alpha = float(os.environ.get("RAG_HYBRID_ALPHA", DEFAULT_HYBRID_ALPHA))
+        self.recency_weight = float(os.environ.get("RAG_RECENCY_WEIGHT", DEFAULT_RECENCY_WEIGHT))
+        self.mmr_lambda = float(os.environ.get("RAG_MMR_LAMBDA", DEFAULT_MMR_LAMBDA))
+        self.recent_days = float(os.environ.get("RAG_RECENT_DAYS", DEFAULT_RECENT_DAYS))
+        self.search_error = None  # Last search failure, so callers can tell it from no match
+
+    @property
+    def collection_kwargs(self):
+        """Only override Chroma's default embedding function when one is configured"""
+        if self._collection_kwargs is None:
+            embedding_function = self.embedding_function
+            if embedding_function is None:
+                from embeddings import get_embedding_function
+                embedding_function = get_embedding_function()
+            self._collection_kwargs = {}
+            if embedding_function is not None:
+                self._collection_kwargs["embedding_function"] = embedding_function
+        return self._collection_kwargs
+
+    @property
+    def client(self):
+        """ChromaDB client with persistent storage"""
+        if self._client is None:
+            import chromadb
+            self._client = chromadb.PersistentClient(path=os.path.join(self.data_dir, "chroma_db"))
+        return self._client
+
+    @property
+    def collection(self):
+        """Shared collection for conversations, created on first use"""
+        if SHARED_COLLECTION not in self.partitions:
+            self.partitions[SHARED_COLLECTION] = self.client.get_or_create_collection(
+                name=SHARED_COLLECTION,
+                metadata={"description": "DynAmi conversation memories"},
+                **self.collection_kwargs
+            )
+        return self.partitions[SHARED_COLLECTION]
+
+    def partition_name(self, user_id):
+        """Return the collection name holding a user's conversations"""
+        if self.partition_mode == "shared":
+            return SHARED_COLLECTION
+
+        # Hash user ids so any id maps to a valid collection name
+        digest = hashlib.sha1(str(user_id).encode("utf-8")).hexdigest()
+        if self.partition_mode == "user":
+            return f"{SHARED_COLLECTION}_user_{digest[:16]}"
+        return f"{SHARED_COLLECTION}_bucket_{int(digest, 16) % self.partition_buckets:03d}"
+
+    def get_partition(self, user_id, create=True, cold=False):
+        """Return the cached collection for a user, or None if it does not exist yet"""
+        name = self.partition_name(user_id) + (COLD_SUFFIX if cold else "")
+        if name == SHARED_COLLECTION:
+            return self.collection
+        if name in self.partitions:
+            return self.partitions[name]
+
+        collection_kwargs = self.collection_kwargs  # Embedding errors must not read as a missing collection
+        if create:
+            collection = self.client.get_or_create_collection(
+                name=name,
+                metadata={"description": "DynAmi conversation memories", "partition": self.partition_mode,
+                          "tier": "cold" if cold else "hot"},
+                **collection_kwargs
+            )
+        else:
+            try:
+                collection = self.client.get_collection(name=name, **collection_kwargs)
+            except Exception:
+                return None
+
+        self.partitions[name] = collection
+        return collection
+
+    def user_filter(self, user_id):
+        """Metadata filter needed on top of the partition to isolate a user"""
+        if self.partition_mode == "user":
+            return None  # The collection only holds this user
+        return {"user_id": user_id}
+
+    def time_filter(self, where=None, since=None, until=None):
+        """Add an epoch window [since, until) to a metadata filter"""
+        conditions = [where] if where else []
+        if since is not None:
+            conditions.append({"epoch": {"$gte": float(since)}})
+        if until is not None:
+            conditions.append({"epoch": {"$lt": float(until)}})
+        if len(conditions) > 1:
+            return {"$and": conditions}
+        return conditions[0] if conditions else None
+
+    def list_partitions(self, cold=False):
+        """Return every conversation collection of a tier, shared one included"""
+        collections = []
+        for entry in self.client.list_collections():
+            name = getattr(entry, "name", entry)
+            if name.endswith(COLD_SUFFIX) != cold:
+                continue
+            base = name[:-len(COLD_SUFFIX)] if cold else name
+            if base == SHARED_COLLECTION or base.startswith(f"{SHARED_COLLECTION}_user_") \
+                    or base.startswith(f"{SHARED_COLLECTION}_bucket_"):
+                collections.append(self.partitions.get(name) or self.client.get_collection(name=name, **self.collection_kwargs))
+        return collections
 
     def add_conversation(self, conversation_id, message, response, user_id="default", metadata=None):
         """Add a conversation to the vector database"""
         try:
-            # Combine message and response for better context
-            full_text = f"User: {message}\nRobot: {response}"
+            self.add_conversations([(conversation_id, message, response, user_id, metadata)])
+            return True
+
+        except Exception as e:
+            print(f"Error adding conversation: {e}", file=sys.stderr)
+            return False
 
-            # Prepare metadata
+    @span("rag.add")
+    def add_conversations(self, conversations):
+        """Add (id, message, response, user_id, metadata) tuples, one Chroma call per partition"""
+        groups = {}
+        lexical_records = []
+        for conversation_id, message, response, user_id, metadata in conversations:
+            # Prepare metadata, the numeric epoch is what time windows filter on
+            now = datetime.now()
             conv_metadata = {
                 "user_id": user_id,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": now.isoformat(),
+                "epoch": now.timestamp(),
                 "message": message,
                 "response": response
             }
@@ -36,144 +249,784 @@ class SimpleRAGService:
             if metadata:
                 conv_metadata.update(metadata)
 
-            # Add to ChromaDB
-            self.collection.add(
-                documents=[full_text],
-                metadatas=[conv_metadata],
-                ids=[conversation_id]
-            )
+            # Imported conversations keep the time they happened, not the time they were stored
+            original_epoch = to_epoch(conv_metadata.get("originalTimestamp"))
+            if original_epoch is not None:
+                conv_metadata["timestamp"] = datetime.fromtimestamp(original_epoch).isoformat()
+                conv_metadata["epoch"] = original_epoch
 
-            return True
+            group = groups.setdefault(self.partition_name(user_id), (user_id, [], [], []))
+            group[1].append(conversation_id)
+            group[2].append(f"User: {message}\nRobot: {response}")  # Combine message and response for better context
+            group[3].append(conv_metadata)
+            lexical_records.append((conversation_id, user_id, message, response, conv_metadata["timestamp"]))
+
+        # Add to ChromaDB
+        for user_id, ids, documents, metadatas in groups.values():
+            self.get_partition(user_id).add(documents=documents, metadatas=metadatas, ids=ids)
 
+        # The vector store is the source of truth, a lexical failure is not fatal
+        try:
+            self.lexical.add(lexical_records)
         except Exception as e:
-            print(f"Error adding conversation: {e}", file=sys.stderr)
-            return False
+            print(f"Error indexing conversations: {e}", file=sys.stderr)
+
+        return len(lexical_records)
+
+    @span("rag.search")
+    def search_conversations(self, query, user_id="default", n_results=5, mode=None, rerank=False, candidates=None,
+                             include_cold=False, since=None, until=None, recent_days=None, fuse=False):
+        """Search for relevant conversations using semantic similarity, BM25 or both
 
-    def search_conversations(self, query, user_id="default", n_results=5):
-        """Search for relevant conversations using semantic similarity"""
+        since and until (epoch seconds) restrict the search to a time window. With
+        recent_days, the last days are searched first and the whole window only
+        when they hold fewer than n_results matches.
+
+        query may also be a list of queries: they are embedded in one batch and
+        sent as one Chroma query, and {"results": [...per query]} is returned,
+        with a "fused" de-duplicated list when fuse is set.
+        """
+        mode = mode or self.search_mode
+        recent_days = self.recent_days if recent_days is None else recent_days
+        queries = query if isinstance(query, list) else [query]
         try:
-            # Search in ChromaDB
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results,
-                where={"user_id": user_id}  # Filter by user
-            )
+            if mode not in SEARCH_MODES:
+                raise ValueError(f"Unknown search mode: {mode}")
 
-            # Format results
-            conversations = []
-            if results['documents'] and len(results['documents'][0]) > 0:
-                for i in range(len(results['documents'][0])):
-                    conversations.append({
-                        'id': results['ids'][0][i],
-                        'message': results['metadatas'][0][i]['message'],
-                        'response': results['metadatas'][0][i]['response'],
-                        'timestamp': results['metadatas'][0][i]['timestamp'],
-                        'similarity': 1 - results['distances'][0][i],  # Convert distance to similarity
-                        'user_id': results['metadatas'][0][i]['user_id']
-                    })
-
-            return conversations
+            results = [None] * len(queries)
+            pending = list(range(len(queries)))
+            if recent_days and since is None:
+                recent = self.search_window([queries[i] for i in pending], user_id, n_results, mode, rerank,
+                                            candidates, include_cold, time.time() - recent_days * 86400, until)
+                for i, found in zip(pending, recent):
+                    results[i] = found
+                # Only the queries the recent days could not answer are widened
+                pending = [i for i in pending if len(results[i]) < n_results]
+            if pending:
+                widened = self.search_window([queries[i] for i in pending], user_id, n_results, mode, rerank,
+                                             candidates, include_cold, since, until)
+                for i, found in zip(pending, widened):
+                    results[i] = found
 
         except Exception as e:
             print(f"Error searching conversations: {e}", file=sys.stderr)
+            self.search_error = str(e)
+            results = [[] for _ in queries]
+
+        if not isinstance(query, list):
+            return results[0]
+        response = {"results": results}
+        if fuse:
+            response["fused"] = fuse_results(results, n_results)
+        return response
+
+    def search_window(self, queries, user_id, n_results, mode, rerank_results, candidates, include_cold, since, until):
+        """Per-query results of a batch of queries in one time window"""
+        if mode == "vector" or include_cold:
+            # The cold tier is only reachable through vector search
+            return self.vector_search_batch(queries, user_id, n_results, rerank_results, candidates, include_cold,
+                                            since, until)
+        if mode == "lexical":
+            if rerank_results:
+                fetch = max(candidates or n_results * RERANK_CANDIDATE_FACTOR, n_results)
+                return [self.rerank_fused(self.lexical_search(query, user_id, fetch, since, until), user_id, n_results)
+                        for query in queries]
+            return [self.lexical_search(query, user_id, n_results, since, until) for query in queries]
+        return self.hybrid_search_batch(queries, user_id, n_results, since, until, rerank_results, candidates)
+
+    def vector_search(self, query, user_id, n_results, rerank_results=False, candidates=None, include_cold=False,
+                      since=None, until=None):
+        """Nearest-neighbour search in the user's Chroma collection
+
+        With rerank_results, a larger candidate set is fetched with its embeddings,
+        blended with recency and diversified with MMR before keeping n_results.
+        """
+        return self.vector_search_batch([query], user_id, n_results, rerank_results, candidates, include_cold,
+                                        since, until)[0]
+
+    def vector_search_batch(self, queries, user_id, n_results, rerank_results=False, candidates=None,
+                            include_cold=False, since=None, until=None):
+        """vector_search for several queries with one embedding batch and one query per tier"""
+        collections = [self.get_partition(user_id, create=False)]
+        if include_cold:
+            collections.append(self.get_partition(user_id, create=False, cold=True))
+        collections = [collection for collection in collections if collection is not None]
+        if not collections:
+            return [[] for _ in queries]
+
+        include = ["metadatas", "distances"]
+        fetch = n_results
+        if rerank_results:
+            include.append("embeddings")
+            fetch = max(candidates or n_results * RERANK_CANDIDATE_FACTOR, n_results)
+
+        hits = [{"ids": [], "metadatas": [], "distances": [], "embeddings": []} for _ in queries]
+        for collection in collections:
+            # Search in ChromaDB, every query is embedded in the same batch
+            results = collection.query(
+                query_texts=queries,
+                n_results=fetch,
+                where=self.time_filter(self.user_filter(user_id), since, until),  # Filter by user and time window
+                include=include
+            )
+            for i, query_hits in enumerate(hits):
+                if results['ids'] and len(results['ids'][i]) > 0:
+                    query_hits["ids"].extend(results['ids'][i])
+                    query_hits["metadatas"].extend(results['metadatas'][i])
+                    query_hits["distances"].extend(results['distances'][i])
+                    if rerank_results:
+                        query_hits["embeddings"].extend(results['embeddings'][i])
+
+        return [self.rank_vector_hits(query_hits, n_results, fetch, rerank_results, merge=len(collections) > 1)
+                for query_hits in hits]
+
+    def rank_vector_hits(self, hits, n_results, fetch, rerank_results, merge):
+        """Format one query's Chroma hits, merging tiers and re-ranking when asked"""
+        ids, metadatas, distances, embeddings = hits["ids"], hits["metadatas"], hits["distances"], hits["embeddings"]
+        if not ids:
+            return []
+
+        if merge:
+            # Merge tiers by distance before keeping the requested candidates
+            order = sorted(range(len(ids)), key=lambda i: distances[i])[:fetch]
+            ids = [ids[i] for i in order]
+            metadatas = [metadatas[i] for i in order]
+            distances = [distances[i] for i in order]
+            if rerank_results:
+                embeddings = [embeddings[i] for i in order]
+
+        similarities = [1 - distance for distance in distances]  # Convert distance to similarity
+
+        if not rerank_results:
+            return [self.format_result(ids[i], metadatas[i], similarities[i]) for i in range(len(ids))]
+
+        selected, scores, recency = rerank(
+            similarities,
+            embeddings,
+            parse_timestamps([metadata.get('timestamp') for metadata in metadatas]),
+            n_results,
+            recency_weight=self.recency_weight,
+            mmr_lambda=self.mmr_lambda
+        )
+        return [
+            dict(self.format_result(ids[i], metadatas[i], similarities[i]),
+                 recency=float(recency[i]), score=float(scores[i]))
+            for i in selected
+        ]
+
+    def format_result(self, conversation_id, metadata, similarity):
+        """Shape a stored conversation the way the Node server expects it"""
+        return {
+            'id': conversation_id,
+            'message': metadata['message'],
+            'response': metadata['response'],
+            'timestamp': metadata['timestamp'],
+            'similarity': similarity,
+            'user_id': metadata['user_id']
+        }
+
+    def lexical_search(self, query, user_id, n_results, since=None, until=None):
+        """BM25 search that never touches the embedding model"""
+        hits = self.lexical.search(query, user_id, n_results, since, until)
+        if not hits:
+            return []
+
+        # Scale BM25 into [0, 1] so it reads like a similarity downstream
+        top_score = hits[0][1] or 1.0
+        return [dict(doc, similarity=score / top_score, lexical_score=score) for doc, score in hits]
+
+    def hybrid_search(self, query, user_id, n_results, since=None, until=None, rerank_results=False, candidates=None):
+        """Fuse vector similarity and normalized BM25 over both candidate sets
+
+        With rerank_results, more candidates are fused and then re-ranked by
+        recency and MMR like vector_search does.
+        """
+        return self.hybrid_search_batch([query], user_id, n_results, since, until, rerank_results, candidates)[0]
+
+    def hybrid_search_batch(self, queries, user_id, n_results, since=None, until=None, rerank_results=False,
+                            candidates=None):
+        """hybrid_search for several queries, the vector side runs as one batch"""
+        keep = n_results
+        fetch = n_results * 2
+        if rerank_results:
+            keep = fetch = max(candidates or n_results * RERANK_CANDIDATE_FACTOR, n_results)
+        lexical = [self.lexical_search(query, user_id, fetch, since, until) for query in queries]
+        try:
+            vector = self.vector_search_batch(queries, user_id, fetch, since=since, until=until)
+        except Exception as e:
+            # Embedding unavailable: lexical results are still useful
+            print(f"Vector search failed, using lexical results: {e}", file=sys.stderr)
+            fused_results = [results[:keep] for results in lexical]
+        else:
+            fused_results = [self.fuse_hybrid(vector_results, lexical_results)[:keep]
+                             for vector_results, lexical_results in zip(vector, lexical)]
+
+        if rerank_results:
+            return [self.rerank_fused(results, user_id, n_results) for results in fused_results]
+        return fused_results
+
+    def fuse_hybrid(self, vector_results, lexical_results):
+        """Weighted sum of one query's vector and lexical scores, best first"""
+        fused = {}
+        for result in vector_results:
+            fused[result['id']] = dict(result, vector_score=result['similarity'], lexical_score=0.0)
+        for result in lexical_results:
+            entry = fused.setdefault(result['id'], dict(result, vector_score=0.0))
+            entry['lexical_score'] = result['similarity']
+
+        alpha = self.hybrid_alpha
+        for entry in fused.values():
+            vector_score = min(max(entry['vector_score'], 0.0), 1.0)
+            entry['similarity'] = alpha * vector_score + (1 - alpha) * entry['lexical_score']
+        return sorted(fused.values(), key=lambda entry: entry['similarity'], reverse=True)
+
+    def rerank_fused(self, results, user_id, n_results):
+        """Re-rank hybrid or lexical results with the embeddings stored for them"""
+        if not results:
             return []
+        stored = {}
+        try:
+            collection = self.get_partition(user_id, create=False)
+            if collection is not None:
+                found = collection.get(ids=[result['id'] for result in results], include=["embeddings"])
+                stored = dict(zip(found['ids'], found['embeddings']))
+        except Exception as e:
+            print(f"Embeddings unavailable, re-ranking without diversity: {e}", file=sys.stderr)
+
+        # A hit missing from the collection gets a null vector: ranked on score and recency only
+        dimension = len(next(iter(stored.values()))) if stored else 1
+        embeddings = [stored.get(result['id'], np.zeros(dimension)) for result in results]
+        selected, scores, recency = rerank(
+            [result['similarity'] for result in results],
+            embeddings,
+            parse_timestamps([result.get('timestamp') for result in results]),
+            n_results,
+            recency_weight=self.recency_weight,
+            mmr_lambda=self.mmr_lambda
+        )
+        return [dict(results[i], recency=float(recency[i]), score=float(scores[i])) for i in selected]
+
+    def iter_conversation_ids(self, where=None, page_size=PAGE_SIZE, collection=None):
+        """Yield pages of conversation ids without loading documents or metadata"""
+        collection = collection or self.collection
+        offset = 0
+        while True:
+            page = collection.get(where=where, limit=page_size, offset=offset, include=[])
+            ids = page['ids']
+            if not ids:
+                break
+            yield ids
+            if len(ids) < page_size:
+                break
+            offset += len(ids)
+
+    def existing_ids(self, ids, batch_size=PAGE_SIZE, collection=None):
+        """Return the subset of ids already present in the collection"""
+        collection = collection or self.collection
+        found = set()
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            found.update(collection.get(ids=batch, include=[])['ids'])
+        return found
 
-    def get_conversation_count(self, user_id=None):
-        """Get total number of conversations"""
+    def delete_where(self, collection, where=None):
+        """Delete matching records page by page and return how many were removed"""
+        deleted = 0
+        while True:
+            # Always read the first page: the previous one has been deleted
+            page = collection.get(where=where, limit=PAGE_SIZE, include=[])
+            if not page['ids']:
+                break
+            collection.delete(ids=page['ids'])
+            deleted += len(page['ids'])
+        return deleted
+
+    def get_conversation_count(self, user_id=None, since=None, until=None):
+        """Get total number of conversations, optionally in the epoch window [since, until)"""
         try:
+            if since is not None or until is not None:
+                return self.count_window(user_id, since, until)
             if user_id:
-                result = self.collection.get(where={"user_id": user_id})
-                return len(result['ids'])
+                count = sum(len(ids) for ids in self.iter_conversation_ids({"user_id": user_id}))
+                if self.partition_mode == "shared":
+                    return count
+
+                # Records not yet moved out of the shared collection still count
+                collection = self.get_partition(user_id, create=False)
+                if collection is None:
+                    return count
+                if self.partition_mode == "user":
+                    return count + collection.count()
+                return count + sum(len(ids) for ids in self.iter_conversation_ids({"user_id": user_id}, collection=collection))
             else:
-                result = self.collection.get()
-                return len(result['ids'])
+                if self.partition_mode == "shared":
+                    return self.collection.count()
+                return sum(collection.count() for collection in self.list_partitions())
         except Exception as e:
             print(f"Error getting conversation count: {e}", file=sys.stderr)
             return 0
 
-    def migrate_from_json(self, json_file_path):
-        """Migrate existing conversations from JSON to ChromaDB"""
+    def count_window(self, user_id, since, until):
+        """Count conversations in a time window by paging ids of matching records"""
+        if user_id:
+            targets = [(self.collection, {"user_id": user_id})]
+            collection = self.get_partition(user_id, create=False)
+            if collection is not None and collection is not self.collection:
+                targets.append((collection, self.user_filter(user_id)))
+        else:
+            targets = [(collection, None) for collection in self.list_partitions()]
+
+        return sum(len(ids) for collection, where in targets
+                   for ids in self.iter_conversation_ids(self.time_filter(where, since, until), collection=collection))
+
+    def backfill_epochs(self, page_size=PAGE_SIZE):
+        """Add the numeric epoch to records stored before it existed, in both tiers
+
+        Imported records are dated from their originalTimestamp, which also
+        corrects those whose timestamp and epoch were set at migration time.
+        """
+        try:
+            updated = 0
+            lexical_times = []
+            for collection in self.list_partitions() + self.list_partitions(cold=True):
+                offset = 0
+                while True:
+                    page = collection.get(limit=page_size, offset=offset, include=["metadatas"])
+                    if not page['ids']:
+                        break
+
+                    ids, metadatas = [], []
+                    for conv_id, metadata in zip(page['ids'], page['metadatas']):
+                        original_epoch = to_epoch(metadata.get('originalTimestamp'))
+                        if original_epoch is not None:
+                            if abs(metadata.get('epoch', float('nan')) - original_epoch) < 1e-3:
+                                continue  # Already dated from the original
+                            timestamp = datetime.fromtimestamp(original_epoch).isoformat()
+                            ids.append(conv_id)
+                            metadatas.append(dict(metadata, timestamp=timestamp, epoch=original_epoch))
+                            lexical_times.append((conv_id, timestamp, original_epoch))
+                        elif 'epoch' not in metadata:
+                            epoch = to_epoch(metadata.get('timestamp'))
+                            if epoch is not None:
+                                ids.append(conv_id)
+                                metadatas.append(dict(metadata, epoch=epoch))
+                    if ids:
+                        # Metadata only: documents and embeddings are left untouched
+                        collection.update(ids=ids, metadatas=metadatas)
+                        updated += len(ids)
+                    offset += len(page['ids'])
+
+            return {"backfilled": updated,
+                    "lexical": self.lexical.set_times(lexical_times) + self.lexical.backfill_epochs()}
+
+        except Exception as e:
+            print(f"Error backfilling timestamps: {e}", file=sys.stderr)
+            return {"backfilled": 0, "lexical": 0}
+
+    @span("rag.migrate")
+    def migrate_from_json(self, json_file_path, batch_size=MIGRATION_BATCH_SIZE, resume=True):
+        """Stream conversations from JSON into ChromaDB in batches, resuming from a checkpoint"""
         try:
             if not os.path.exists(json_file_path):
                 print(f"JSON file not found: {json_file_path}")
                 return 0
 
-            with open(json_file_path, 'r') as f:
-                conversations = json.load(f)
+            json_file_path = os.path.abspath(json_file_path)
+            start_offset, skip_until_id = self.resume_point(json_file_path) if resume else (0, None)
 
             migrated_count = 0
-            for conv in conversations:
-                # Check if already exists
-                try:
-                    existing = self.collection.get(ids=[conv['id']])
-                    if existing['ids']:
-                        continue  # Skip if already exists
-                except:
-                    pass
-
-                # Add to ChromaDB
-                success = self.add_conversation(
-                    conversation_id=conv['id'],
-                    message=conv['message'],
-                    response=conv['response'],
-                    user_id=conv.get('userContext', {}).get('userId', 'default'),
-                    metadata={
-                        'visionContext': conv.get('visionContext', ''),
-                        'originalTimestamp': conv.get('timestamp', '')
-                    }
-                )
+            seen_count = 0
+            started_at = time.perf_counter()
+            batch = []
+            for conv, end_offset in iter_json_array(json_file_path, start_offset):
+                if skip_until_id is not None:
+                    # File was rewritten: fast-forward past the last migrated conversation
+                    if conv.get('id') == skip_until_id:
+                        skip_until_id = None
+                    continue
 
-                if success:
-                    migrated_count += 1
+                batch.append(conv)
+                if len(batch) >= batch_size:
+                    migrated_count += self.migrate_batch(batch)
+                    seen_count += len(batch)
+                    self.save_checkpoint(json_file_path, end_offset, batch[-1]['id'])
+                    batch = []
 
+                    elapsed = time.perf_counter() - started_at
+                    print(f"Migrated {migrated_count}/{seen_count} conversations "
+                          f"({seen_count / elapsed:.0f}/s)", file=sys.stderr)
+
+            if skip_until_id is not None:
+                # Last migrated id is gone: migrate everything, existing ids are still skipped
+                print("Checkpoint not found in JSON file, restarting migration", file=sys.stderr)
+                return self.migrate_from_json(json_file_path, batch_size, resume=False)
+
+            if batch:
+                migrated_count += self.migrate_batch(batch)
+                seen_count += len(batch)
+                self.save_checkpoint(json_file_path, end_offset, batch[-1]['id'])
+
+            elapsed = time.perf_counter() - started_at
+            print(f"Migration finished: {migrated_count} new of {seen_count} read in {elapsed:.1f}s", file=sys.stderr)
             return migrated_count
 
         except Exception as e:
             print(f"Error migrating from JSON: {e}", file=sys.stderr)
             return 0
 
+    def migrate_batch(self, conversations):
+        """Add the conversations of a batch that are not stored yet"""
+        # Check existence in batches instead of one round-trip per conversation
+        by_partition = {}
+        for conv in conversations:
+            user_id = conv.get('userContext', {}).get('userId', 'default')
+            by_partition.setdefault(self.partition_name(user_id), (user_id, []))[1].append(conv['id'])
+
+        existing = set()
+        for user_id, ids in by_partition.values():
+            try:
+                collection = self.get_partition(user_id, create=False)
+                if collection is not None:
+                    existing |= self.existing_ids(ids, collection=collection)
+            except Exception as e:
+                print(f"Error checking existing conversations: {e}", file=sys.stderr)
+
+        new_conversations = [
+            (conv['id'], conv['message'], conv['response'],
+             conv.get('userContext', {}).get('userId', 'default'),
+             {
+                 'visionContext': conv.get('visionContext', ''),
+                 'originalTimestamp': conv.get('timestamp', '')
+             })
+            for conv in conversations if conv['id'] not in existing
+        ]
+        if not new_conversations:
+            return 0
+        return self.add_conversations(new_conversations)
+
+    def checkpoint_path(self):
+        return os.path.join(self.data_dir, "migration_checkpoint.json")
+
+    def read_fingerprint(self, json_file_path, offset):
+        """Bytes just before offset, to check the file still has the same prefix"""
+        with open(json_file_path, 'rb') as f:
+            f.seek(max(0, offset - CHECKPOINT_FINGERPRINT_BYTES))
+            return f.read(min(offset, CHECKPOINT_FINGERPRINT_BYTES)).hex()
+
+    def save_checkpoint(self, json_file_path, offset, last_id):
+        checkpoint = {
+            "path": json_file_path,
+            "offset": offset,
+            "last_id": last_id,
+            "fingerprint": self.read_fingerprint(json_file_path, offset)
+        }
+        temporary_path = self.checkpoint_path() + ".tmp"
+        with open(temporary_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(temporary_path, self.checkpoint_path())
+
+    def resume_point(self, json_file_path):
+        """Return (byte offset, id to fast-forward past) for the next migration"""
+        try:
+            with open(self.checkpoint_path(), 'r') as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return 0, None
+
+        if checkpoint.get("path") != json_file_path:
+            return 0, None
+
+        offset = checkpoint.get("offset", 0)
+        if offset <= os.path.getsize(json_file_path) and \
+                self.read_fingerprint(json_file_path, offset) == checkpoint.get("fingerprint"):
+            return offset, None
+
+        # The Node server rewrote or trimmed the file, find the last id again
+        return 0, checkpoint.get("last_id")
+
     def clear_user_conversations(self, user_id):
         """Clear all conversations for a specific user"""
         try:
-            # Get all conversations for user
-            result = self.collection.get(where={"user_id": user_id})
+            self.lexical.remove_user(user_id)
+            cleared = self.delete_where(self.collection, {"user_id": user_id})
 
-            if result['ids']:
-                # Delete them
-                self.collection.delete(ids=result['ids'])
-                return len(result['ids'])
-            return 0
+            cold = self.get_partition(user_id, create=False, cold=True)
+            if cold is not None:
+                cleared += self.delete_where(cold, {"user_id": user_id})
+
+            if self.partition_mode == "shared":
+                return cleared
+
+            collection = self.get_partition(user_id, create=False)
+            if collection is None:
+                return cleared
+            if self.partition_mode == "user":
+                # Dropping the whole collection is cheaper than deleting records
+                cleared += collection.count()
+                self.client.delete_collection(name=collection.name)
+                self.partitions.pop(collection.name, None)
+                return cleared
+            return cleared + self.delete_where(collection, {"user_id": user_id})
 
         except Exception as e:
             print(f"Error clearing user conversations: {e}", file=sys.stderr)
             return 0
 
+    def partition_shared_collection(self, page_size=PAGE_SIZE):
+        """Move conversations from the shared collection into their partitions"""
+        if self.partition_mode == "shared":
+            return 0
+
+        try:
+            moved = 0
+            while True:
+                # Reuse stored embeddings so records are not embedded again
+                page = self.collection.get(limit=page_size, include=["documents", "metadatas", "embeddings"])
+                if not page['ids']:
+                    break
+
+                groups = {}
+                for i, conv_id in enumerate(page['ids']):
+                    user_id = page['metadatas'][i].get('user_id', 'default')
+                    group = groups.setdefault(self.partition_name(user_id), (user_id, [], [], [], []))
+                    group[1].append(conv_id)
+                    group[2].append(page['documents'][i])
+                    group[3].append(page['metadatas'][i])
+                    group[4].append(page['embeddings'][i])
+
+                for user_id, ids, documents, metadatas, embeddings in groups.values():
+                    self.get_partition(user_id).upsert(
+                        ids=ids,
+                        documents=documents,
+                        metadatas=metadatas,
+                        embeddings=embeddings
+                    )
+
+                # Only delete once the page is safely stored in its partitions
+                self.collection.delete(ids=page['ids'])
+                moved += len(page['ids'])
+                print(f"Partitioned {moved} conversations", file=sys.stderr)
+
+            return moved
+
+        except Exception as e:
+            print(f"Error partitioning conversations: {e}", file=sys.stderr)
+            return 0
+
+    def rebuild_lexical_index(self, page_size=PAGE_SIZE):
+        """Index every stored conversation, e.g. records added before the index existed"""
+        try:
+            indexed = 0
+            for collection in self.list_partitions():
+                offset = 0
+                while True:
+                    page = collection.get(limit=page_size, offset=offset, include=["metadatas"])
+                    if not page['ids']:
+                        break
+
+                    self.lexical.add([
+                        (conv_id, meta.get('user_id', 'default'), meta.get('message', ''),
+                         meta.get('response', ''), meta.get('timestamp', ''))
+                        for conv_id, meta in zip(page['ids'], page['metadatas'])
+                    ])
+                    indexed += len(page['ids'])
+                    offset += len(page['ids'])
+
+            return indexed
+
+        except Exception as e:
+            print(f"Error rebuilding lexical index: {e}", file=sys.stderr)
+            return 0
+
+    def list_user_ids(self, page_size=PAGE_SIZE):
+        """Return every user id with conversations in the hot tier"""
+        user_ids = set()
+        for collection in self.list_partitions():
+            offset = 0
+            while True:
+                page = collection.get(limit=page_size, offset=offset, include=["metadatas"])
+                if not page['ids']:
+                    break
+                user_ids.update(metadata.get('user_id', 'default') for metadata in page['metadatas'])
+                offset += len(page['ids'])
+        return sorted(user_ids)
+
+    def consolidate_user(self, user_id, threshold=DEFAULT_DUPLICATE_THRESHOLD, cold_after_days=DEFAULT_COLD_AFTER_DAYS):
+        """Merge a user's near-duplicate turns and move old ones to the cold tier"""
+        collection = self.get_partition(user_id, create=False)
+        if collection is None:
+            return {"merged": 0, "moved_to_cold": 0}
+
+        records = {"ids": [], "documents": [], "metadatas": [], "embeddings": []}
+        offset = 0
+        while True:
+            page = collection.get(where=self.user_filter(user_id), limit=PAGE_SIZE, offset=offset,
+                                  include=["documents", "metadatas", "embeddings"])
+            if not page['ids']:
+                break
+            for key in records:
+                records[key].extend(page[key])
+            offset += len(page['ids'])
+
+        if not records['ids']:
+            return {"merged": 0, "moved_to_cold": 0}
+
+        # Newest first, so each cluster is represented by its latest turn
+        epochs = record_epochs(records['metadatas'])
+        order = np.argsort(-np.nan_to_num(epochs, nan=0.0), kind="stable")
+        clusters = cluster_near_duplicates(np.asarray(records['embeddings'])[order], threshold)
+
+        merged_ids = []
+        updated_ids, updated_metadatas = [], []
+        for cluster in clusters:
+            if len(cluster) == 1:
+                continue
+            members = [int(order[i]) for i in cluster]
+            representative = members[0]
+            metadata = dict(records['metadatas'][representative])
+            metadata['hit_count'] = sum(int(records['metadatas'][m].get('hit_count', 1)) for m in members)
+            first_seen = [records['metadatas'][m].get('first_timestamp') or records['metadatas'][m].get('timestamp', '')
+                          for m in members]
+            metadata['first_timestamp'] = min((timestamp for timestamp in first_seen if timestamp), default='')
+
+            updated_ids.append(records['ids'][representative])
+            updated_metadatas.append(metadata)
+            records['metadatas'][representative] = metadata
+            merged_ids.extend(records['ids'][m] for m in members[1:])
+
+        if updated_ids:
+            collection.update(ids=updated_ids, metadatas=updated_metadatas)
+        for start in range(0, len(merged_ids), PAGE_SIZE):
+            collection.delete(ids=merged_ids[start:start + PAGE_SIZE])
+        self.lexical.remove(merged_ids)
+
+        # Cold tier: old representatives keep their embeddings but leave the hot collection
+        merged = set(merged_ids)
+        cutoff = time.time() - cold_after_days * 86400
+        cold = [i for i in range(len(records['ids']))
+                if records['ids'][i] not in merged and not np.isnan(epochs[i]) and epochs[i] < cutoff]
+        if cold:
+            cold_collection = self.get_partition(user_id, cold=True)
+            for start in range(0, len(cold), PAGE_SIZE):
+                batch = cold[start:start + PAGE_SIZE]
+                cold_collection.upsert(
+                    ids=[records['ids'][i] for i in batch],
+                    documents=[records['documents'][i] for i in batch],
+                    metadatas=[records['metadatas'][i] for i in batch],
+                    embeddings=[records['embeddings'][i] for i in batch]
+                )
+                collection.delete(ids=[records['ids'][i] for i in batch])
+            self.lexical.remove([records['ids'][i] for i in cold])
+
+        return {"merged": len(merged_ids), "moved_to_cold": len(cold)}
+
+    def storage_report(self, user_ids, queries_per_user=3):
+        """Collection sizes, on-disk size and a search latency sample"""
+        latencies = []
+        for user_id in user_ids:
+            for _ in range(queries_per_user):
+                start = time.perf_counter()
+                self.vector_search("what did we talk about", user_id, 5)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        disk_bytes = 0
+        for root, _, files in os.walk(os.path.join(self.data_dir, "chroma_db")):
+            disk_bytes += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+
+        return {
+            "hot": sum(collection.count() for collection in self.list_partitions()),
+            "cold": sum(collection.count() for collection in self.list_partitions(cold=True)),
+            "disk_bytes": disk_bytes,
+            "search_ms_median": float(np.median(latencies)) if latencies else 0.0
+        }
+
+    @span("rag.maintain")
+    def maintain(self, threshold=DEFAULT_DUPLICATE_THRESHOLD, cold_after_days=DEFAULT_COLD_AFTER_DAYS):
+        """Consolidate every user and report size and latency before and after"""
+        user_ids = self.list_user_ids()
+        before = self.storage_report(user_ids)
+
+        merged = moved = 0
+        for user_id in user_ids:
+            try:
+                stats = self.consolidate_user(user_id, threshold, cold_after_days)
+                merged += stats["merged"]
+                moved += stats["moved_to_cold"]
+            except Exception as e:
+                print(f"Error consolidating conversations for {user_id}: {e}", file=sys.stderr)
+
+        return {
+            "users": len(user_ids),
+            "merged": merged,
+            "moved_to_cold": moved,
+            "before": before,
+            "after": self.storage_report(user_ids)
+        }
+
+def parse_time(value):
+    """Epoch seconds or an ISO timestamp from the command line"""
+    try:
+        return float(value)
+    except ValueError:
+        epoch = to_epoch(value)
+        if epoch is None:
+            raise ValueError(f"Invalid time: {value}")
+        return epoch
+
+def time_options(options):
+    """since/until epochs from --since/--until options, None when absent"""
+    return tuple(parse_time(options[name]) if name in options else None for name in ("since", "until"))
+
 def main():
     """Command line interface for RAG operations"""
     if len(sys.argv) < 2:
         print("Usage: python3 rag_service.py <command> [args...]")
         print("Commands:")
-        print("  search <query> [user_id] [n_results]")
+        print("  search <query> [user_id] [n_results] [vector|lexical|hybrid] [--rerank] [--candidates=N] [--cold]")
+        print("         [--since=T] [--until=T] [--recent-days=N]   (T: epoch seconds or ISO timestamp)")
+        print("         [--multi] [--fuse]   (--multi: query is a JSON array of queries searched in one batch)")
+        print("         options may also come first, ended by -- so a query starting with -- stays positional")
         print("  add <message> <response> [user_id]")
-        print("  migrate <json_file_path>")
-        print("  count [user_id]")
+        print("  migrate <json_file_path> [--restart] [--batch-size=N]")
+        print("  count [user_id] [--since=T] [--until=T]")
         print("  clear <user_id>")
+        print("  partition [user|hashed]")
+        print("  reindex")
+        print("  backfill")
+        print("  maintain [--threshold=0.95] [--cold-after-days=30]")
         sys.exit(1)
 
     command = sys.argv[1]
-    rag = SimpleRAGService()
+    partition_mode = sys.argv[2] if command == "partition" and len(sys.argv) > 2 else None
+    with span("rag.init"):
+        rag = SimpleRAGService(partition_mode=partition_mode)
 
     try:
         if command == "search":
-            if len(sys.argv) < 3:
+            args, options = split_options(sys.argv[2:])
+            if len(args) < 1:
                 print("Error: search requires query")
                 sys.exit(1)
 
-            query = sys.argv[2]
-            user_id = sys.argv[3] if len(sys.argv) > 3 else "default"
-            n_results = int(sys.argv[4]) if len(sys.argv) > 4 else 5
+            query = json.loads(args[0]) if "multi" in options else args[0]
+            if "multi" in options and not (isinstance(query, list) and all(isinstance(q, str) for q in query)):
+                print("Error: --multi requires a JSON array of strings")
+                sys.exit(1)
+            user_id = args[1] if len(args) > 1 else "default"
+            n_results = int(args[2]) if len(args) > 2 else 5
+            mode = args[3] if len(args) > 3 else None
+            candidates = int(options["candidates"]) if "candidates" in options else None
+            since, until = time_options(options)
+            recent_days = float(options["recent-days"]) if "recent-days" in options else None
 
-            results = rag.search_conversations(query, user_id, n_results)
+            results = rag.search_conversations(query, user_id, n_results, mode,
+                                               rerank="rerank" in options, candidates=candidates,
+                                               include_cold="cold" in options, since=since, until=until,
+                                               recent_days=recent_days, fuse="fuse" in options)
+            if rag.search_error:
+                # Let the Node server fall back instead of reading this as no history
+                print(json.dumps({"error": rag.search_error}))
+                sys.exit(1)
             print(json.dumps(results, indent=2))
 
         elif command == "add":
@@ -190,17 +1043,21 @@ def main():
             print(json.dumps({"success": success, "id": conv_id}))
 
         elif command == "migrate":
-            if len(sys.argv) < 3:
+            args, options = split_options(sys.argv[2:])
+            if len(args) < 1:
                 print("Error: migrate requires json file path")
                 sys.exit(1)
 
-            json_file = sys.argv[2]
-            count = rag.migrate_from_json(json_file)
+            json_file = args[0]
+            count = rag.migrate_from_json(json_file, int(options.get("batch-size", MIGRATION_BATCH_SIZE)),
+                                          resume="restart" not in options)
             print(json.dumps({"migrated": count}))
 
         elif command == "count":
-            user_id = sys.argv[2] if len(sys.argv) > 2 else None
-            count = rag.get_conversation_count(user_id)
+            args, options = split_options(sys.argv[2:])
+            user_id = args[0] if args else None
+            since, until = time_options(options)
+            count = rag.get_conversation_count(user_id, since, until)
             print(json.dumps({"count": count}))
 
         elif command == "clear":
@@ -212,6 +1069,26 @@ def main():
             count = rag.clear_user_conversations(user_id)
             print(json.dumps({"cleared": count}))
 
+        elif command == "partition":
+            count = rag.partition_shared_collection()
+            print(json.dumps({"partitioned": count, "mode": rag.partition_mode}))
+
+        elif command == "reindex":
+            count = rag.rebuild_lexical_index()
+            print(json.dumps({"indexed": count}))
+
+        elif command == "backfill":
+            print(json.dumps(rag.backfill_epochs()))
+
+        elif command == "maintain":
+            _, options = split_options(sys.argv[2:])
+            report = rag.maintain(
+                threshold=float(options.get("threshold", DEFAULT_DUPLICATE_THRESHOLD)),
+                cold_after_days=float(options.get("cold-after-days",
+                                                  os.environ.get("RAG_COLD_AFTER_DAYS", DEFAULT_COLD_AFTER_DAYS)))
+            )
+            print(json.dumps(report, indent=2))
+
         else:
             print(f"Unknown command: {command}")
             sys.exit(1)
@@ -221,4 +1098,5 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with profiled("rag_service"):
+        main()
\ No newline at end of file
@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import numpy as np
+
+DEFAULT_DECAY_HOURS = 24.0   # Same decay as the JS recency score
+DEFAULT_RECENCY_WEIGHT = 0.3
+DEFAULT_MMR_LAMBDA = 0.7     # 1.0 is pure relevance, 0.0 pure diversity
+
+def to_epoch(timestamp):
+    """Convert an ISO timestamp to epoch seconds, None when unparseable"""
+    try:
+        # The Node server writes UTC timestamps ending with "Z"
+        if timestamp.endswith("Z"):
+            timestamp = timestamp[:-1] + "+00:00"
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def parse_timestamps(timestamps):
+    """Convert ISO timestamps to epoch seconds, NaN when unparseable"""
+    epochs = np.full(len(timestamps), np.nan)
+    for i, timestamp in enumerate(timestamps):
+        epoch = to_epoch(timestamp)
+        if epoch is not None:
+            epochs[i] = epoch
+    return epochs
+
+def recency_scores(epochs, now=None, decay_hours=DEFAULT_DECAY_HOURS):
+    """Exponential decay of age in hours, 0 for unknown timestamps"""
+    now = datetime.now().timestamp() if now is None else now
+    age_hours = np.maximum(now - np.asarray(epochs, dtype=np.float64), 0.0) / 3600.0
+    return np.nan_to_num(np.exp(-age_hours / decay_hours), nan=0.0)
+
+def mmr_select(embeddings, scores, k, mmr_lambda=DEFAULT_MMR_LAMBDA):
+    """Greedy maximal marginal relevance, returns the selected row indices in order"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    scores = np.asarray(scores, dtype=np.float32)
+    count = len(scores)
+    k = min(k, count)
+    if k <= 0:
+        return []
+
+    # Cosine similarity between every pair of candidates
+    unit = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    pairwise = unit @ unit.T
+
+    selected = []
+    available = np.ones(count, dtype=bool)
+    max_similarity = np.full(count, -np.inf, dtype=np.float32)
+    for _ in range(k):
+        if selected:
+            marginal = mmr_lambda * scores - (1 - mmr_lambda) * max_similarity
+        else:
+            marginal = scores.copy()
+        marginal[~available] = -np.inf
+
+        best = int(np.argmax(marginal))
+        selected.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, pairwise[best])
+
+    return selected
+
+def rerank(similarities, embeddings, epochs, k, recency_weight=DEFAULT_RECENCY_WEIGHT,
+           mmr_lambda=DEFAULT_MMR_LAMBDA, decay_hours=DEFAULT_DECAY_HOURS, now=None):
+    """Blend similarity with recency, then diversify; returns (indices, scores, recency)"""
+    similarities = np.asarray(similarities, dtype=np.float32)
+    recency = recency_scores(epochs, now, decay_hours).astype(np.float32)
+    scores = (1 - recency_weight) * similarities + recency_weight * recency
+
+    selected = mmr_select(embeddings, scores, k, mmr_lambda)
+    return selected, scores, recency
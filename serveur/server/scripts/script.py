@@ -1,23 +1,268 @@
+import base64
+import io
+import json
+import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import speech_recognition as sr
 
-def transcribe_audio(audio_file):
-    recognizer = sr.Recognizer()
+from profiling import profiled, span
+
+FRAME_MS = 30
+PADDING_MS = 150          # Silence kept around speech so words are not clipped
+MAX_SILENCE_MS = 400      # Longer internal pauses are shortened to this
+MIN_ENERGY = 300          # RMS floor for 16-bit audio, below is always silence
+NOISE_FACTOR = 3.0        # Speech must be this many times louder than the noise floor
+SPEECH_FRACTION = 0.1     # ...but never needs more than this fraction of loud speech energy (-20 dB)
+MAX_CHUNK_SECONDS = 15.0  # Long recordings are cut at pauses into chunks of at most this
+MIN_CHUNK_SECONDS = 3.0
+CHUNK_WORKERS = int(os.environ.get("STT_CHUNK_WORKERS", 4))
+
+def stub_backend(recognizer, audio_data):
+    """Local stand-in for tests: describes the audio instead of recognizing it"""
+    seconds = len(audio_data.frame_data) / (audio_data.sample_rate * audio_data.sample_width)
+    return f"{seconds:.2f} seconds of speech"
+
+def google_backend(recognizer, audio_data):
+    return recognizer.recognize_google(audio_data)
+
+BACKENDS = {
+    'google': google_backend,
+    'stub': stub_backend
+}
+
+@span("stt.load")
+def load_audio(recognizer, source):
+    """Read a WAV/AIFF/FLAC file path or bytes into AudioData"""
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    with sr.AudioFile(source) as audio_source:
+        return recognizer.record(audio_source)
+
+def frame_energies(samples, frame_length):
+    """RMS energy of consecutive frames"""
+    count = len(samples) // frame_length
+    if count == 0:
+        return np.zeros(0)
+    frames = samples[:count * frame_length].astype(np.float32).reshape(count, frame_length)
+    return np.sqrt(np.mean(frames ** 2, axis=1))
+
+def speech_frames(audio_data, frame_ms=FRAME_MS):
+    """Return (16-bit samples, frame length, frame energies, speech mask)"""
+    # Work on 16-bit mono samples whatever the input width
+    samples = np.frombuffer(audio_data.get_raw_data(convert_width=2), dtype=np.int16)
+    frame_length = max(1, audio_data.sample_rate * frame_ms // 1000)
+
+    energies = frame_energies(samples, frame_length)
+    if len(energies) == 0:
+        return samples, frame_length, energies, np.zeros(0, dtype=bool)
+
+    # Without real silence the 10th percentile is quiet speech, the cap keeps it from being cut
+    noise_floor, speech_level = np.percentile(energies, [10, 90])
+    threshold = max(MIN_ENERGY, min(noise_floor * NOISE_FACTOR, speech_level * SPEECH_FRACTION))
+    return samples, frame_length, energies, energies > threshold
+
+@span("stt.vad")
+def trim_silence(audio_data, frame_ms=FRAME_MS, padding_ms=PADDING_MS, max_silence_ms=MAX_SILENCE_MS):
+    """Energy-based voice activity detection
+
+    Drops leading and trailing silence and shortens long pauses. Returns the
+    trimmed AudioData and the number of seconds removed.
+    """
+    samples, frame_length, energies, speech = speech_frames(audio_data, frame_ms)
+    if len(energies) == 0:
+        return audio_data, 0.0
+
+    if not speech.any():
+        return sr.AudioData(b"", audio_data.sample_rate, 2), len(samples) / audio_data.sample_rate
+
+    # Pad speech frames on both sides
+    padding = padding_ms // frame_ms
+    keep = np.convolve(speech.astype(np.int32), np.ones(2 * padding + 1, dtype=np.int32), mode="same") > 0
+
+    # Cap every run of silence between speech to max_silence_ms
+    max_silence = max_silence_ms // frame_ms
+    first, last = np.flatnonzero(keep)[[0, -1]]
+    kept = np.zeros_like(keep)
+    run = 0
+    for i in range(first, last + 1):
+        run = 0 if keep[i] else run + 1
+        kept[i] = keep[i] or run <= max_silence
+
+    indices = np.flatnonzero(kept)
+    trimmed = samples[:len(energies) * frame_length].reshape(len(energies), frame_length)[indices].ravel()
+    removed = (len(samples) - len(trimmed)) / audio_data.sample_rate
+    return sr.AudioData(trimmed.tobytes(), audio_data.sample_rate, 2), removed
+
+@span("stt.split")
+def split_at_silences(audio_data, max_chunk_seconds=MAX_CHUNK_SECONDS, min_chunk_seconds=MIN_CHUNK_SECONDS,
+                      frame_ms=FRAME_MS):
+    """Cut audio into chunks no longer than max_chunk_seconds, at the quietest point
+
+    Returns a list of (start_seconds, end_seconds, AudioData).
+    """
+    samples, frame_length, energies, speech = speech_frames(audio_data, frame_ms)
+    frames_per_second = 1000 / frame_ms
+    max_frames = max(1, int(max_chunk_seconds * frames_per_second))
+    min_frames = min(max_frames, max(1, int(min_chunk_seconds * frames_per_second)))
+
+    # Prefer cutting in silence, then in the lowest energy frame
+    cost = energies + np.where(speech, energies.max(initial=0) + 1, 0)
+
+    cuts = [0]
+    while len(energies) - cuts[-1] > max_frames:
+        window = cost[cuts[-1] + min_frames:cuts[-1] + max_frames]
+        cuts.append(cuts[-1] + min_frames + int(np.argmin(window)))
+    cuts.append(len(energies))
+
+    chunks = []
+    for start, end in zip(cuts, cuts[1:]):
+        if end == len(energies):
+            chunk_samples = samples[start * frame_length:]  # Keep the partial last frame
+        else:
+            chunk_samples = samples[start * frame_length:end * frame_length]
+        chunks.append((
+            start * frame_length / audio_data.sample_rate,
+            (start * frame_length + len(chunk_samples)) / audio_data.sample_rate,
+            sr.AudioData(chunk_samples.tobytes(), audio_data.sample_rate, 2)
+        ))
+    return chunks
+
+class TranscriptionWorker:
+    """Keeps one recognizer alive across requests"""
+
+    def __init__(self, backend=None, vad=True):
+        backend = backend or os.environ.get("STT_BACKEND", "google")
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown speech backend: {backend}")
+        self.backend = BACKENDS[backend]
+        self.recognizer = sr.Recognizer()
+        self.vad = vad
+
+    def transcribe(self, source):
+        """Transcribe a file path or audio bytes, returning a result dict"""
+        started_at = time.perf_counter()
+        result = {'text': None, 'error': None}
 
-    with sr.AudioFile(audio_file) as source:
-        audio_data = recognizer.record(source)
         try:
-            text = recognizer.recognize_google(audio_data)
-            print(text)
+            audio_data = load_audio(self.recognizer, source)
+            result['audio_seconds'] = round(len(audio_data.frame_data) / (audio_data.sample_rate * audio_data.sample_width), 3)
+            removed = 0.0
+            if self.vad:
+                audio_data, removed = trim_silence(audio_data)
+            result['removed_seconds'] = round(removed, 3)
+
+            if len(audio_data.frame_data) == 0:
+                result['error'] = "No speech detected"
+            else:
+                with span("stt.recognize"):
+                    result['text'] = self.backend(self.recognizer, audio_data)
         except sr.UnknownValueError:
-            print("Google Speech Recognition could not understand audio")
+            result['error'] = "Google Speech Recognition could not understand audio"
         except sr.RequestError as e:
-            print("Could not request results from Google Speech Recognition service; {0}".format(e))
+            result['error'] = "Could not request results from Google Speech Recognition service; {0}".format(e)
+        except Exception as e:
+            result['error'] = str(e)
 
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python3 script.py <audio_file>")
+        result['latency_ms'] = round((time.perf_counter() - started_at) * 1000, 1)
+        return result
+
+    def recognize_chunk(self, index, start, end, audio_data):
+        """Transcribe one chunk, reporting its own timing and error"""
+        started_at = time.perf_counter()
+        chunk = {'index': index, 'start': round(start, 3), 'end': round(end, 3), 'text': None, 'error': None}
+        try:
+            if self.vad:
+                audio_data, _ = trim_silence(audio_data)
+            if len(audio_data.frame_data) == 0:
+                chunk['error'] = "No speech detected"
+            else:
+                with span("stt.recognize_chunk"):
+                    chunk['text'] = self.backend(self.recognizer, audio_data)
+        except sr.UnknownValueError:
+            chunk['error'] = "Google Speech Recognition could not understand audio"
+        except sr.RequestError as e:
+            chunk['error'] = "Could not request results from Google Speech Recognition service; {0}".format(e)
+        except Exception as e:
+            chunk['error'] = str(e)
+        chunk['latency_ms'] = round((time.perf_counter() - started_at) * 1000, 1)
+        return chunk
+
+    def transcribe_chunked(self, source, workers=CHUNK_WORKERS, max_chunk_seconds=MAX_CHUNK_SECONDS):
+        """Split a long recording at pauses and transcribe the chunks concurrently"""
+        started_at = time.perf_counter()
+        result = {'text': None, 'error': None, 'chunks': []}
+
+        try:
+            audio_data = load_audio(self.recognizer, source)
+            result['audio_seconds'] = round(len(audio_data.frame_data) / (audio_data.sample_rate * audio_data.sample_width), 3)
+            chunks = split_at_silences(audio_data, max_chunk_seconds)
+
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                # map keeps the chunk order whatever order they finish in
+                result['chunks'] = list(pool.map(lambda args: self.recognize_chunk(*args),
+                                                 [(i, start, end, chunk) for i, (start, end, chunk) in enumerate(chunks)]))
+
+            texts = [chunk['text'] for chunk in result['chunks'] if chunk['text']]
+            result['text'] = " ".join(texts) if texts else None
+            failed = [chunk for chunk in result['chunks'] if chunk['error'] and chunk['error'] != "No speech detected"]
+            if failed:
+                result['error'] = f"{len(failed)} of {len(chunks)} chunks failed"
+            elif not texts:
+                result['error'] = "No speech detected"
+        except Exception as e:
+            result['error'] = str(e)
+
+        result['latency_ms'] = round((time.perf_counter() - started_at) * 1000, 1)
+        return result
+
+    def serve(self, requests=sys.stdin, responses=sys.stdout):
+        """Answer JSON line requests {"id", "path"} or {"id", "audio_base64"} until EOF
+
+        Requests with "chunked": true are split at pauses and transcribed in parallel.
+        """
+        for line in requests:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                source = request.get('path') or base64.b64decode(request['audio_base64'])
+                if request.get('chunked'):
+                    result = self.transcribe_chunked(source)
+                else:
+                    result = self.transcribe(source)
+                result['id'] = request.get('id')
+            except Exception as e:
+                result = {'id': None, 'text': None, 'error': f"Invalid request: {e}"}
+            responses.write(json.dumps(result) + "\n")
+            responses.flush()
+
+def transcribe_audio(audio_file, chunked=False):
+    worker = TranscriptionWorker()
+    result = worker.transcribe_chunked(audio_file) if chunked else worker.transcribe(audio_file)
+    print(result['text'] if result['text'] is not None else result['error'])
+    if chunked:
+        # Per-chunk timing and errors for diagnosis, stdout keeps the plain text
+        print(json.dumps(result['chunks']), file=sys.stderr)
+
+def main():
+    if len(sys.argv) == 2 and sys.argv[1] == "--worker":
+        TranscriptionWorker().serve()
+        return
+
+    chunked = "--chunked" in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != "--chunked"]
+    if len(args) != 1:
+        print("Usage: python3 script.py <audio_file> [--chunked]")
+        print("       python3 script.py --worker   (JSON lines on stdin/stdout)")
         sys.exit(1)
 
-    audio_file = sys.argv[1]
-    transcribe_audio(audio_file)
\ No newline at end of file
+    audio_file = args[0]
+    transcribe_audio(audio_file, chunked)
+
+if __name__ == "__main__":
+    with profiled("script"):
+        main()
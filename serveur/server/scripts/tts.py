@@ -1,17 +1,149 @@
-from gtts import gTTS
+import hashlib
+import json
+import os
+import re
+import shutil
 import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
-OUTPUT_PATH = "output.mp3"
+import file_cache
+from profiling import profiled, span
 
-if len(sys.argv) < 2:
- print("Usage: python3 tts.py 'votre texte ici'")
- sys.exit(1)
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+CACHE_DIR = os.environ.get("TTS_CACHE_DIR", os.path.join(DATA_DIR, 'tts_cache'))
+OUTPUT_DIR = os.environ.get("TTS_OUTPUT_DIR", os.path.join(DATA_DIR, 'tts_output'))
+CACHE_MAX_BYTES = int(os.environ.get("TTS_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+DEFAULT_LANGUAGE = 'fr'
+STREAM_WORKERS = int(os.environ.get("TTS_STREAM_WORKERS", 3))
+MIN_SENTENCE_CHARS = 20  # Shorter sentences are merged with the next one
 
-text = sys.argv[1]
-language = 'fr'
-  
-inference = gTTS(text=text, lang=language, slow=False) 
+SENTENCE_END = re.compile(r'(?<=[.!?…])\s+|\n+')
 
-inference.save(OUTPUT_PATH)
+@span("tts.gtts")
+def gtts_engine(text, language, path):
+    """Synthesize with Google TTS"""
+    from gtts import gTTS
 
-print(OUTPUT_PATH)
\ No newline at end of file
+    inference = gTTS(text=text, lang=language, slow=False)
+    inference.save(path)
+
+def stub_engine(text, language, path):
+    """Offline stand-in writing a deterministic placeholder, for tests"""
+    with open(path, 'wb') as f:
+        f.write(f"{language}:{text}".encode('utf-8'))
+
+ENGINES = {
+    'gtts': gtts_engine,
+    'stub': stub_engine
+}
+
+def cache_key(text, language, engine_name):
+    """Content address of a synthesized phrase"""
+    return hashlib.sha256(f"{engine_name}\0{language}\0{text}".encode('utf-8')).hexdigest()
+
+def unique_output(cache_path, output_dir):
+    """Give the request its own file; a hard link costs nothing when possible"""
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, f"{uuid.uuid4().hex}.mp3")
+    try:
+        os.link(cache_path, output_path)
+    except OSError:
+        shutil.copyfile(cache_path, output_path)
+    return output_path
+
+@span("tts.synthesize")
+def synthesize(text, language=DEFAULT_LANGUAGE, engine_name=None, cache_dir=CACHE_DIR,
+               output_dir=OUTPUT_DIR, max_bytes=CACHE_MAX_BYTES):
+    """Return (output_path, cached) for the spoken text, synthesizing only on a cache miss"""
+    engine_name = engine_name or os.environ.get("TTS_ENGINE", "gtts")
+    if engine_name not in ENGINES:
+        raise ValueError(f"Unknown TTS engine: {engine_name}")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(cache_dir, f"{cache_key(text, language, engine_name)}.mp3")
+
+    if os.path.exists(cache_path):
+        try:
+            file_cache.mark_used(cache_path)
+            return unique_output(cache_path, output_dir), True
+        except FileNotFoundError:
+            pass  # Evicted by another request since the check: synthesize it again
+
+    file_cache.write_atomic(cache_path, lambda path: ENGINES[engine_name](text, language, path))
+    file_cache.evict(cache_dir, max_bytes, '.mp3', keep=cache_path)
+    return unique_output(cache_path, output_dir), False
+
+def split_sentences(text, min_chars=MIN_SENTENCE_CHARS):
+    """Split on sentence punctuation and line breaks, merging fragments that are too short"""
+    sentences = []
+    pending = ""
+    for part in SENTENCE_END.split(text.strip()):
+        part = part.strip()
+        if not part:
+            continue
+        pending = f"{pending} {part}" if pending else part
+        if len(pending) >= min_chars:
+            sentences.append(pending)
+            pending = ""
+    if pending:
+        if sentences and len(pending) < min_chars:
+            sentences[-1] = f"{sentences[-1]} {pending}"
+        else:
+            sentences.append(pending)
+    return sentences
+
+def synthesize_stream(text, language=DEFAULT_LANGUAGE, workers=STREAM_WORKERS, engine_name=None):
+    """Yield one chunk per sentence, in order, while later sentences are synthesized ahead"""
+    sentences = split_sentences(text)
+    started_at = time.perf_counter()
+
+    def job(sentence):
+        output_path, cached = synthesize(sentence, language, engine_name)
+        return output_path, cached, time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        # Keep at most `workers` sentences in flight beyond the one being emitted
+        futures = {}
+        for index, sentence in enumerate(sentences):
+            futures[index] = pool.submit(job, sentence)
+            first_pending = index - workers
+            if first_pending >= 0:
+                yield chunk_result(first_pending, sentences, futures.pop(first_pending), started_at)
+        for index in sorted(futures):
+            yield chunk_result(index, sentences, futures[index], started_at)
+
+def chunk_result(index, sentences, future, started_at):
+    output_path, cached, finished_at = future.result()
+    return {
+        'index': index,
+        'total': len(sentences),
+        'text': sentences[index],
+        'path': output_path,
+        'cached': cached,
+        'ready_ms': round((finished_at - started_at) * 1000, 1)
+    }
+
+def main():
+    stream = '--stream' in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != '--stream']
+    if len(args) < 1:
+        print("Usage: python3 tts.py 'votre texte ici' [language] [--stream]")
+        sys.exit(1)
+
+    text = args[0]
+    language = args[1] if len(args) > 1 else DEFAULT_LANGUAGE
+
+    if stream:
+        # One JSON line per sentence, flushed so playback can start right away
+        for chunk in synthesize_stream(text, language):
+            print(json.dumps(chunk), flush=True)
+        return
+
+    output_path, _ = synthesize(text, language)
+    print(output_path)
+
+if __name__ == "__main__":
+    with profiled("tts"):
+        main()
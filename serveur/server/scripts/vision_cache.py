@@ -0,0 +1,66 @@
+import hashlib
+import json
+import os
+import time
+
+import file_cache
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+CACHE_DIR = os.environ.get("VISION_CACHE_DIR", os.path.join(DATA_DIR, 'vision_cache'))
+TTL_SECONDS = float(os.environ.get("VISION_CACHE_TTL", 300))
+MAX_BYTES = int(os.environ.get("VISION_CACHE_MAX_BYTES", 5 * 1024 * 1024))
+ENABLED = os.environ.get("VISION_CACHE", "1") != "0"
+
+
+def file_version(*paths):
+    """Fingerprint of files a result depends on (model weights, known faces)"""
+    parts = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            parts.append(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}")
+        except OSError:
+            parts.append(f"{os.path.basename(path)}:missing")
+    return ";".join(parts)
+
+
+def cache_key(frame_bytes, version):
+    """Content address of a frame analyzed by a given model/config version"""
+    digest = hashlib.sha256(version.encode('utf-8'))
+    digest.update(b"\0")
+    digest.update(frame_bytes)
+    return digest.hexdigest()
+
+
+def get(key, cache_dir=CACHE_DIR, ttl=TTL_SECONDS):
+    """Cached result marked with "cached": True, or None on a miss or expiry"""
+    if not ENABLED:
+        return None
+    path = os.path.join(cache_dir, f"{key}.json")
+    try:
+        if time.time() - os.path.getmtime(path) > ttl:
+            os.remove(path)
+            return None
+        with open(path, 'r') as f:
+            result = json.load(f)
+        file_cache.mark_used(path)  # The mtime, and so the TTL, is kept
+    except (OSError, ValueError):
+        return None  # Missing, or expired/evicted concurrently
+    result['cached'] = True
+    return result
+
+
+def put(key, result, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES):
+    """Store a result, then evict least recently used entries beyond max_bytes"""
+    if not ENABLED:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{key}.json")
+
+    def write(temporary_path):
+        with open(temporary_path, 'w') as f:
+            json.dump({name: value for name, value in result.items() if name != 'cached'}, f)
+
+    file_cache.write_atomic(path, write)
+    file_cache.evict(cache_dir, max_bytes, '.json', keep=path)
+
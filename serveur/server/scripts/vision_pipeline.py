@@ -0,0 +1,232 @@
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+import cv2
+
+import enhanced_detect
+from frame_ring import SHM_PREFIX, FrameConsumer, FrameRing, ring_name
+from letterbox import letterbox, to_original_box
+from profiling import profiled
+
+QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", 2))
+POST_WORKERS = int(os.environ.get("PIPELINE_POST_WORKERS", 2))
+
+STOP = object()  # End of stream marker
+
+
+class StageError:
+    """Carries a stage failure to the output, later stages pass it through"""
+
+    def __init__(self, stage, error):
+        self.stage = stage
+        self.error = error
+
+
+class LatestSlot:
+    """Single-slot handoff where a new frame replaces the one not taken yet"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.item = None
+        self.dropped = 0
+
+    def put(self, item):
+        with self.condition:
+            if item is STOP:
+                # The last frame is still delivered, the end marker waits for it
+                while self.item is not None:
+                    self.condition.wait()
+            elif self.item is not None:
+                self.dropped += 1
+            self.item = item
+            self.condition.notify_all()
+
+    def get(self):
+        with self.condition:
+            while self.item is None:
+                self.condition.wait()
+            item, self.item = self.item, None
+            self.condition.notify_all()
+            return item
+
+
+class Pipeline:
+    """Runs stages concurrently on bounded queues and emits results in frame order
+
+    stages is a list of (name, function, workers); each function maps the
+    previous stage's value to the next one. Frames are fed through a latest
+    slot, so when the source outpaces the pipeline the frames not yet started
+    are dropped and the newest one wins.
+    """
+
+    def __init__(self, stages, queue_size=QUEUE_SIZE):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.slot = LatestSlot()
+        self.stats = {"captured": 0, "processed": 0, "errors": 0}
+
+    def capture(self, frames):
+        try:
+            for timestamp, frame in frames:
+                self.stats["captured"] += 1
+                self.slot.put((timestamp, frame))
+        except Exception as e:
+            # A failing source ends the stream, the frames already captured still come out
+            print(f"Error capturing frames: {e}", file=sys.stderr)
+            self.stats["source_error"] = str(e)
+        finally:
+            self.slot.put(STOP)
+
+    def feed(self, first_queue):
+        """Number frames as they leave the slot, the output order follows these numbers"""
+        order = 0
+        while True:
+            item = self.slot.get()
+            if item is STOP:
+                first_queue.put(STOP)
+                return
+            first_queue.put((order, item[0], item[1]))
+            order += 1
+
+    def work(self, name, function, inbox, outbox, remaining):
+        while True:
+            item = inbox.get()
+            if item is STOP:
+                inbox.put(STOP)  # Let the sibling workers see it too
+                with remaining["lock"]:
+                    remaining["count"] -= 1
+                    if remaining["count"] == 0:
+                        outbox.put(STOP)
+                return
+            order, timestamp, value = item
+            if not isinstance(value, StageError):
+                try:
+                    value = function(value)
+                except Exception as e:
+                    value = StageError(name, str(e))
+            outbox.put((order, timestamp, value))
+
+    def run(self, frames, emit):
+        """Process an iterable of (timestamp, frame), calling emit(order, timestamp, value) in order
+
+        Returns the stats; "source_error" is set when the frame source raised.
+        """
+        queues = [queue.Queue(self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [
+            threading.Thread(target=self.capture, args=(frames,), daemon=True),
+            threading.Thread(target=self.feed, args=(queues[0],), daemon=True)
+        ]
+        for index, (name, function, workers) in enumerate(self.stages):
+            remaining = {"lock": threading.Lock(), "count": workers}
+            threads += [threading.Thread(target=self.work, args=(name, function, queues[index], queues[index + 1],
+                                                                 remaining), daemon=True)
+                        for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+
+        # Reorder: stages with several workers may finish frames out of order
+        pending = {}
+        next_order = 0
+        while True:
+            item = queues[-1].get()
+            if item is STOP:
+                break
+            pending[item[0]] = item
+            while next_order in pending:
+                order, timestamp, value = pending.pop(next_order)
+                if isinstance(value, StageError):
+                    self.stats["errors"] += 1
+                self.stats["processed"] += 1
+                emit(order, timestamp, value)
+                next_order += 1
+
+        self.stats["dropped"] = self.slot.dropped
+        return self.stats
+
+
+def detection_stages(net, classes, output_layers, post_workers=POST_WORKERS):
+    """Letterbox + blob, forward pass on its own worker, then parsing/NMS/navigation"""
+
+    def preprocess(frame):
+        processed_frame, metadata = letterbox(frame)
+        return processed_frame.shape, metadata, enhanced_detect.make_blob(processed_frame)
+
+    def infer(value):
+        shape, metadata, blob = value
+        return shape, metadata, enhanced_detect.run_network(net, output_layers, blob)
+
+    def postprocess(value):
+        (height, width, _), metadata, outs = value
+        detection = enhanced_detect.parse_detections(outs, classes, width, height)
+        return {
+            'objects': detection['objects'],
+            'people_count': detection['people_count'],
+            'people_boxes': [to_original_box(person['box'], metadata) for person in detection['people_positions']],
+            'navigation': enhanced_detect.generate_navigation_instruction(detection['people_positions'], width, height),
+            'scene_description': enhanced_detect.generate_scene_description(detection)
+        }
+
+    return [("preprocess", preprocess, 1), ("infer", infer, 1), ("postprocess", postprocess, post_workers)]
+
+
+def open_frames(source, max_frames=None):
+    """Yield (timestamp, frame) from a camera index, a video file or a "shm:<name>" ring"""
+    count = 0
+    if source.startswith(SHM_PREFIX):
+        consumer = FrameConsumer(FrameRing.attach(ring_name(source)))
+        while max_frames is None or count < max_frames:
+            frame = consumer.next(timeout=1.0)
+            if frame is None:
+                return  # Producer stopped
+            # Copy: the slot is reused while the frame is still in the pipeline
+            yield frame.timestamp, frame.image.copy()
+            count += 1
+        return
+
+    capture = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    try:
+        while max_frames is None or count < max_frames:
+            ok, frame = capture.read()
+            if not ok:
+                return
+            yield time.time(), frame
+            count += 1
+    finally:
+        capture.release()
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python3 vision_pipeline.py <camera_index|video_file|shm:ring_name> [max_frames]")
+        sys.exit(1)
+
+    net, classes, output_layers = enhanced_detect.load_yolo_model()
+    if net is None:
+        print("Error loading YOLO model", file=sys.stderr)
+        sys.exit(1)
+
+    def emit(order, timestamp, value):
+        if isinstance(value, StageError):
+            result = {'success': False, 'error': f"{value.stage}: {value.error}"}
+        else:
+            result = dict(value, success=True)
+        result.update({'frame': order, 'latency_ms': round((time.time() - timestamp) * 1000, 1)})
+        print(json.dumps(result), flush=True)
+
+    pipeline = Pipeline(detection_stages(net, classes, output_layers))
+    max_frames = int(sys.argv[2]) if len(sys.argv) == 3 else None
+    try:
+        stats = pipeline.run(open_frames(sys.argv[1], max_frames), emit)
+    except KeyboardInterrupt:
+        stats = dict(pipeline.stats, dropped=pipeline.slot.dropped)
+    print(json.dumps(stats), file=sys.stderr)
+    if "source_error" in stats:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    with profiled("vision_pipeline"):
+        main()
@@ -127,15 +127,25 @@ class MemoryService {
         try {
             const userId = userContext.userId || 'default';
 
-            // Use real RAG with ChromaDB
-            let ragResults = await this.searchWithRAG(query, userId, maxResults * 2); // Get more results for re-ranking
+            // Use real RAG with ChromaDB, recency and diversity re-ranking happen in Python
+            let ragResults = await this.searchWithRAG(query, userId, maxResults, null, true); // Python returns the re-ranked top results
 
-            if (ragResults && ragResults.length > 0) {
+            if (ragResults) {
+                if (ragResults.length === 0) {
+                    return []; // No history yet, nothing to fall back to
+                }
                 // Apply multimodal contextual re-ranking
                 ragResults = this.applyContextualReRanking(ragResults, emotionContext, preferences, userContext);
                 return ragResults.slice(0, maxResults); // Return top results after re-ranking
             }
 
+            // Vector search failed or timed out: BM25 search in the RAG service does not need the embedding model
+            const lexicalResults = await this.searchWithRAG(query, userId, maxResults, 'lexical');
+            if (lexicalResults && lexicalResults.length > 0) {
+                console.warn('RAG vector search failed, using lexical search');
+                return lexicalResults;
+            }
+
             // Fallback to old method if RAG fails
             console.warn('RAG search failed, falling back to keyword search');
             return await this.getFallbackContext(query, userContext, maxResults);
@@ -147,19 +157,34 @@ class MemoryService {
     }
 
     // Effectue une recherche sémantique dans ChromaDB via script Python
-    async searchWithRAG(query, userId, maxResults) {
+    // Un tableau de requêtes est recherché en un seul lot et renvoie { results, fused }
+    // Renvoie null si la recherche a échoué ou expiré, [] si rien ne correspond
+    async searchWithRAG(query, userId, maxResults, mode = null, rerank = false, fuse = false) {
         try {
             const { spawn } = require('child_process');
             const path = require('path');
 
+            const args = [
+                path.join(__dirname, '../scripts/rag_service.py'),
+                'search'
+            ];
+            if (rerank) {
+                args.push('--rerank');
+            }
+            if (Array.isArray(query)) {
+                args.push('--multi');
+                if (fuse) {
+                    args.push('--fuse');
+                }
+            }
+            // Options first: after '--' the user's text is never read as an option
+            args.push('--', Array.isArray(query) ? JSON.stringify(query) : query, userId, maxResults.toString());
+            if (mode) {
+                args.push(mode); // vector, lexical or hybrid
+            }
+
             return new Promise((resolve, reject) => {
-                const pythonProcess = spawn('python3', [
-                    path.join(__dirname, '../scripts/rag_service.py'),
-                    'search',
-                    query,
-                    userId,
-                    maxResults.toString()
-                ]);
+                const pythonProcess = spawn('python3', args);
 
                 let output = '';
                 let errorOutput = '';
@@ -179,24 +204,24 @@ class MemoryService {
                             resolve(results);
                         } catch (parseError) {
                             console.error('Error parsing RAG results:', parseError);
-                            resolve([]);
+                            resolve(null);
                         }
                     } else {
                         console.error('RAG search failed:', errorOutput);
-                        resolve([]);
+                        resolve(null);
                     }
                 });
 
                 // Timeout after 5 seconds
                 setTimeout(() => {
                     pythonProcess.kill();
-                    resolve([]);
+                    resolve(null);
                 }, 5000);
             });
 
         } catch (error) {
             console.error('RAG search error:', error);
-            return [];
+            return null;
         }
     }
 
@@ -405,6 +430,11 @@ class MemoryService {
                     output += data.toString();
                 });
 
+                // Progress is reported on stderr, the migration resumes from its checkpoint if killed
+                pythonProcess.stderr.on('data', (data) => {
+                    console.log(`RAG migration: ${data.toString().trim()}`);
+                });
+
                 pythonProcess.on('close', (code) => {
                     if (code === 0) {
                         try {
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Voice activity detection test on synthetic clips
+
+Continuous speech with long quieter passages must not lose audio, while
+leading and trailing silence is still trimmed.
+"""
+
+import sys
+import os
+
+import numpy as np
+import speech_recognition as sr
+
+# Add the scripts directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+from script import trim_silence
+
+RATE = 16000
+
+def speech_like(seconds, seed=0):
+    """Noise shaped like speech: 1 s loud phrases then 1.5 s quiet ones, 4 Hz syllables"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * RATE)) / RATE
+    level = np.where((t % 2.5) < 1.0, 1.0, 0.25)
+    envelope = level * (0.7 + 0.3 * np.sin(2 * np.pi * 4 * t))
+    return rng.standard_normal(len(t)) * 4000 * envelope
+
+def audio(samples):
+    return sr.AudioData(np.clip(samples, -32768, 32767).astype(np.int16).tobytes(), RATE, 2)
+
+def test_continuous_speech_is_kept():
+    """No real silence: the noise floor is quiet speech and must not be trimmed"""
+    print("🧪 Testing continuous speech...")
+    _, removed = trim_silence(audio(speech_like(5)))
+    print(f"   removed {removed:.2f}s of 5.00s")
+    assert removed < 0.1, removed
+    print("✅ Continuous speech kept")
+
+def test_silence_is_trimmed():
+    """Leading and trailing room noise is still removed"""
+    print("🧪 Testing silence trimming...")
+    rng = np.random.default_rng(1)
+    samples = np.concatenate([rng.standard_normal(RATE) * 50, speech_like(5), rng.standard_normal(2 * RATE) * 50])
+    _, removed = trim_silence(audio(samples))
+    print(f"   removed {removed:.2f}s of 3.00s of silence")
+    assert 2.4 < removed <= 3.0, removed
+    print("✅ Silence trimmed")
+
+if __name__ == "__main__":
+    try:
+        print("🚀 Starting VAD tests...")
+        test_continuous_speech_is_kept()
+        test_silence_is_trimmed()
+        print("\n🎉 All VAD tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Vision pipeline test with stand-in stages
+
+A fast source feeds a slow stage: results must come out in frame order, the
+frames the stage could not keep up with must be dropped in the latest slot,
+and a failing source must end the run instead of hanging it.
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add the scripts directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+from vision_pipeline import Pipeline, StageError
+
+def frames(count, interval):
+    """(timestamp, frame) pairs where the frame is its capture index"""
+    for index in range(count):
+        yield time.time(), index
+        time.sleep(interval)
+
+def run_with_timeout(pipeline, source, timeout=10.0):
+    """Run the pipeline in a thread, returns (emitted, stats) or fails when it hangs"""
+    emitted = []
+    outcome = {}
+    thread = threading.Thread(
+        target=lambda: outcome.update(stats=pipeline.run(source, lambda order, _, value: emitted.append((order, value)))),
+        daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "pipeline did not finish"
+    return emitted, outcome["stats"]
+
+def test_order_and_drops():
+    """Slow stage with several workers: ordered output, stale frames dropped"""
+    print("🧪 Testing ordering and frame dropping...")
+
+    def slow(frame):
+        time.sleep(0.05 if frame % 2 else 0.02)  # Workers finish out of order
+        return frame
+
+    pipeline = Pipeline([("identity", lambda frame: frame, 1), ("slow", slow, 3)])
+    emitted, stats = run_with_timeout(pipeline, frames(60, 0.002))
+
+    orders = [order for order, _ in emitted]
+    captured = [value for _, value in emitted]
+    print(f"   {stats}")
+    assert orders == list(range(len(emitted))), orders
+    assert captured == sorted(captured), "results out of capture order"
+    assert captured[-1] == 59, "the last frame must always be delivered"
+    assert stats["dropped"] > 0 and stats["processed"] + stats["dropped"] == stats["captured"] == 60, stats
+    print("✅ Ordered output with dropped frames")
+
+def test_stage_error_passes_through():
+    """A stage failure reaches the output for that frame only"""
+    print("🧪 Testing stage errors...")
+
+    def fail_on_odd(frame):
+        if frame % 2:
+            raise ValueError("odd frame")
+        return frame
+
+    pipeline = Pipeline([("check", fail_on_odd, 1), ("after", lambda frame: frame * 10, 1)], queue_size=100)
+    emitted, stats = run_with_timeout(pipeline, frames(6, 0.05))
+    assert stats["errors"] == sum(isinstance(value, StageError) for _, value in emitted) > 0, stats
+    assert all(isinstance(value, StageError) or value % 20 == 0 for _, value in emitted), emitted
+    print("✅ Stage errors passed through")
+
+def test_failing_source_ends_run():
+    """A source that raises stops the run and is reported in the stats"""
+    print("🧪 Testing a failing source...")
+
+    def broken():
+        yield from frames(3, 0.01)
+        raise IOError("camera unplugged")
+
+    pipeline = Pipeline([("identity", lambda frame: frame, 1)])
+    emitted, stats = run_with_timeout(pipeline, broken())
+    assert stats["source_error"] == "camera unplugged", stats
+    assert [value for _, value in emitted][-1] == 2
+    print("✅ Failing source reported")
+
+if __name__ == "__main__":
+    try:
+        print("🚀 Starting vision pipeline tests...")
+        test_order_and_drops()
+        test_stage_error_passes_through()
+        test_failing_source_ends_run()
+        print("\n🎉 All vision pipeline tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)